@@ -0,0 +1,95 @@
+"""Посты, авторы и группы в виде словарей для JSON, без лишних полей"""
+from posts.thumbnails import attach_thumbnails
+
+
+def author_data(user):
+    return {
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+    }
+
+
+def group_data(group):
+    if group is None:
+        return None
+    return {'slug': group.slug, 'title': group.title}
+
+
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date,
+    'author': lambda post: author_data(post.author),
+    'group': lambda post: group_data(post.group),
+    'image': lambda post: post.image.url if post.image else None,
+    'thumbnail': lambda post: post.thumbnail_url or None,
+    'comments_count': lambda post: post.comments_count,
+}
+# Столбцы, которые нужны полю ответа: остальные не выбираются
+POST_COLUMNS = {
+    'id': ('id',),
+    'text': ('text',),
+    'pub_date': ('pub_date',),
+    'author': ('author__username', 'author__first_name', 'author__last_name'),
+    'group': ('group__slug', 'group__title'),
+    'image': ('image',),
+    'thumbnail': ('image',),
+    'comments_count': ('comments_count',),
+}
+# Выбираются всегда: ключ курсора пагинации и внешние ключи, которые
+# заполняет group.posts или author.posts
+KEY_COLUMNS = ('id', 'pub_date', 'author', 'group')
+# Связанные объекты, которые выбираются JOIN только если их просили
+RELATED = ('author', 'group')
+
+
+class FieldsError(ValueError):
+    """В fields= есть неизвестные поля"""
+
+
+def parse_fields(value):
+    """Поля из параметра fields=, по умолчанию все"""
+    if not value:
+        return tuple(POST_FIELDS)
+    fields = tuple(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()
+    ))
+    unknown = [name for name in fields if name not in POST_FIELDS]
+    if unknown or not fields:
+        raise FieldsError(
+            'Неизвестные поля: ' + ', '.join(unknown)
+            + '. Доступны: ' + ', '.join(POST_FIELDS)
+        )
+    return fields
+
+
+def select_for(queryset, fields):
+    """Только столбцы и JOIN тех полей, что попадут в ответ"""
+    related = [name for name in RELATED if name in fields]
+    if related:
+        queryset = queryset.select_related(*related)
+    columns = dict.fromkeys(KEY_COLUMNS)
+    for name in fields:
+        columns.update(dict.fromkeys(POST_COLUMNS[name]))
+    return queryset.only(*columns)
+
+
+def posts_data(posts, fields):
+    posts = list(posts)
+    if 'thumbnail' in fields:
+        attach_thumbnails(posts, 'card')
+    return [
+        {name: POST_FIELDS[name](post) for name in fields} for post in posts
+    ]
+
+
+def comment_data(comment):
+    return {
+        'id': comment.pk,
+        'parent': comment.parent_id,
+        'depth': comment.depth,
+        'text': comment.text,
+        'pub_date': comment.pub_date,
+        'author': author_data(comment.author),
+    }
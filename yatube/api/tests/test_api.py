@@ -0,0 +1,142 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import QueryBudgetTestMixin
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TestFeedApi(QueryBudgetTestMixin, TestCase):
+    """JSON-ленты: курсоры, выбор полей и бюджет запросов"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for number in range(12):
+            author = User.objects.create_user(
+                username=f'author{number}', first_name='Имя'
+            )
+            Follow.objects.create(user=cls.reader, author=author)
+            post = Post.objects.create(
+                text=f'Пост номер {number}', author=author, group=cls.group
+            )
+            Comment.objects.create(post=post, author=author, text='Ответ')
+        cls.post = post
+        cls.author = author
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def urls(self):
+        return (
+            reverse('api:index'),
+            reverse('api:group_posts', args=(self.group.slug,)),
+            reverse('api:profile', args=(self.author.username,)),
+            reverse('api:follow_index'),
+            reverse('api:post_detail', args=(self.post.pk,)),
+        )
+
+    def test_within_budget(self):
+        for url in self.urls():
+            for fields in ('', 'id,thumbnail'):
+                with self.subTest(url=url, fields=fields):
+                    cache.clear()
+                    response = self.assertWithinBudget(
+                        self.client, f'{url}?fields={fields}'
+                    )
+                    self.assertEqual(response.status_code, 200)
+
+    def test_cursor_walks_whole_feed(self):
+        url = reverse('api:index')
+        seen = []
+        data = self.client.get(url).json()
+        seen.extend(post['id'] for post in data['results'])
+        self.assertIsNone(data['previous'])
+        data = self.client.get(url, {'after': data['next']}).json()
+        seen.extend(post['id'] for post in data['results'])
+        self.assertIsNone(data['next'])
+        self.assertEqual(
+            seen,
+            list(Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )),
+        )
+        data = self.client.get(url, {'before': data['previous']}).json()
+        self.assertEqual([post['id'] for post in data['results']], seen[:10])
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('api:index'), {'fields': 'id,text'}
+            )
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': self.post.pk, 'text': self.post.text},
+        )
+        # Ненужные столбцы не выбираются
+        posts_query = queries[-1]['sql']
+        self.assertIn('"posts_post"."text"', posts_query)
+        self.assertNotIn('"posts_post"."image"', posts_query)
+        # Компактный JSON без пробелов и с кириллицей как есть
+        self.assertTrue(response.content.startswith(b'{"results":[{"id":'))
+        self.assertIn('Пост номер'.encode(), response.content)
+
+        response = self.client.get(reverse('api:index'), {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['detail'])
+
+    def test_embedded_objects_and_detail(self):
+        data = self.client.get(
+            reverse('api:profile', args=(self.author.username,))
+        ).json()
+        self.assertEqual(data['author']['posts_count'], 1)
+        post = data['results'][0]
+        self.assertEqual(post['author']['first_name'], 'Имя')
+        self.assertEqual(post['group'], {'slug': 'group', 'title': 'Группа'})
+
+        data = self.client.get(
+            reverse('api:post_detail', args=(self.post.pk,))
+        ).json()
+        self.assertEqual(data['comments'][0]['text'], 'Ответ')
+
+    def test_feeds_follow_comments_count(self):
+        """Новый комментарий сбрасывает закэшированные ленты"""
+        params = {'fields': 'id,comments_count'}
+        for url in self.urls()[:3]:
+            self.assertEqual(
+                self.client.get(url, params).json()['results'][0],
+                {'id': self.post.pk, 'comments_count': 1},
+            )
+        self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': 'Ещё'},
+        )
+        for url in self.urls()[:3]:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.client.get(url, params).json()['results'][0],
+                    {'id': self.post.pk, 'comments_count': 2},
+                )
+
+    def test_errors_are_json(self):
+        response = self.client.get(
+            reverse('api:group_posts', args=('missing',))
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('detail', response.json())
+        response = Client().get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_payload_is_much_smaller_than_html(self):
+        html = self.client.get(reverse('posts:main_page'))
+        api = self.client.get(reverse('api:index'), {'fields': 'id,text'})
+        self.assertLess(len(api.content) * 10, len(html.content))
@@ -0,0 +1,126 @@
+from django.db.models import F
+from django.http import JsonResponse
+
+from core.generations import (
+    cache_page_by_generation, condition_by_generation
+)
+from core.query_budget import query_budget
+from posts import threads
+from posts.counters import user_stats
+from posts.models import Group, Post, User
+from posts.scopes import (
+    group_scopes, index_scopes, post_scopes, profile_scopes, with_comments
+)
+from posts.utils.paginator import CursorPaginator
+from yatube.settings import PAGE_CACHE_TIMEOUT, POSTS_PER_PAGE
+
+from .serializers import (
+    FieldsError, author_data, comment_data, group_data, parse_fields,
+    posts_data, select_for
+)
+
+# В лентах у каждого поста число комментариев
+feed_index_scopes = with_comments(index_scopes)
+feed_group_scopes = with_comments(group_scopes)
+feed_profile_scopes = with_comments(profile_scopes)
+
+# Без пробелов и \uXXXX: кириллица в UTF-8 вдвое короче экранированной
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def error(status, detail):
+    return json_response({'detail': detail}, status=status)
+
+
+def feed(request, queryset, **extra):
+    """Страница постов по курсору: ?after= или ?before= из ответа"""
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+    except FieldsError as exception:
+        return error(400, str(exception))
+    page = CursorPaginator(
+        select_for(queryset, fields), POSTS_PER_PAGE
+    ).get_page(
+        after=request.GET.get('after'), before=request.GET.get('before')
+    )
+    return json_response({
+        **extra,
+        'results': posts_data(page, fields),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@condition_by_generation(feed_index_scopes)
+@cache_page_by_generation(PAGE_CACHE_TIMEOUT, feed_index_scopes)
+@query_budget(3)
+def index(request):
+    return feed(request, Post.objects.all())
+
+
+@condition_by_generation(feed_group_scopes)
+@cache_page_by_generation(PAGE_CACHE_TIMEOUT, feed_group_scopes)
+@query_budget(4)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return error(404, 'Группа не найдена')
+    return feed(
+        request, group.posts.all(),
+        group={
+            **group_data(group),
+            'description': group.description,
+            'posts_count': group.posts_count,
+        },
+    )
+
+
+@condition_by_generation(feed_profile_scopes)
+@cache_page_by_generation(PAGE_CACHE_TIMEOUT, feed_profile_scopes)
+@query_budget(5)
+def profile(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error(404, 'Автор не найден')
+    stats = user_stats(author.pk)
+    return feed(
+        request, author.posts.all(),
+        author={
+            **author_data(author),
+            'posts_count': stats.posts_count,
+            'followers_count': stats.followers_count,
+            'following_count': stats.following_count,
+        },
+    )
+
+
+@query_budget(5)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error(401, 'Нужно войти')
+    posts = Post.objects.filter(timeline__user=request.user).annotate(
+        feed_date=F('timeline__pub_date'), feed_id=F('timeline__id')
+    ).order_by('-feed_date', '-feed_id')
+    return feed(request, posts)
+
+
+@condition_by_generation(post_scopes)
+@cache_page_by_generation(PAGE_CACHE_TIMEOUT, post_scopes)
+@query_budget(4)
+def post_detail(request, post_id):
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+    except FieldsError as exception:
+        return error(400, str(exception))
+    post = select_for(Post.objects.all(), fields).filter(pk=post_id).first()
+    if post is None:
+        return error(404, 'Пост не найден')
+    data, = posts_data([post], fields)
+    comments = threads.comments_page(post.pk, request.GET.get('after'))
+    data['comments'] = [comment_data(comment) for comment in comments]
+    data['comments_next'] = comments.next_cursor
+    return json_response(data)
@@ -0,0 +1,126 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import (
+    get_cache_key, has_vary_header, learn_cache_key, patch_cache_control,
+    patch_vary_headers
+)
+from django.views.decorators.http import condition
+
+KEY = 'generation:{}'
+
+
+def now():
+    return time.time_ns() // 1000
+
+
+def get_generations(scopes):
+    """Поколения областей кэша, отсутствующие заводятся текущим временем"""
+    keys = {KEY.format(scope): scope for scope in scopes}
+    found = cache.get_many(list(keys))
+    missing = {key: now() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {scope: found[key] for key, scope in keys.items()}
+
+
+def request_generations(request, scopes):
+    """get_generations, запомненные на время запроса"""
+    scopes = tuple(scopes)
+    known = request.__dict__.setdefault('_generations', {})
+    if scopes not in known:
+        known[scopes] = get_generations(scopes)
+    return known[scopes]
+
+
+def bump(*scopes):
+    """Сбрасывает все страницы, закэшированные для этих областей"""
+    value = now()
+    cache.set_many({KEY.format(scope): value for scope in scopes}, None)
+
+
+def cache_page_by_generation(timeout, scopes):
+    """Как cache_page, но ключ страницы зависит от поколений её областей
+
+    scopes(*args, **kwargs) получает аргументы представления и возвращает
+    имена областей, например ('posts', 'group:cats').
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            generations = request_generations(
+                request, scopes(*args, **kwargs)
+            )
+            key_prefix = 'page:' + '.'.join(
+                str(generations[scope]) for scope in sorted(generations)
+            )
+            cache_key = get_cache_key(request, key_prefix, 'GET', cache)
+            if cache_key is not None:
+                response = cache.get(cache_key)
+                if response is not None:
+                    return response
+            response = view(request, *args, **kwargs)
+            if response.streaming or response.status_code != 200:
+                return response
+            # Страница зависит от пользователя, поэтому кэшируем по cookie
+            patch_vary_headers(response, ('Cookie',))
+            if (
+                not request.COOKIES and response.cookies
+                and has_vary_header(response, 'Cookie')
+            ):
+                return response
+            cache_key = learn_cache_key(
+                request, response, timeout, key_prefix, cache
+            )
+            if hasattr(response, 'render') and callable(response.render):
+                response.add_post_render_callback(
+                    lambda rendered: cache.set(cache_key, rendered, timeout)
+                )
+            else:
+                cache.set(cache_key, response, timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+def condition_by_generation(scopes):
+    """ETag и Last-Modified из поколений областей страницы, ответ 304
+    отдаётся без вызова представления
+
+    В ETag входят и cookie: как и кэш страниц, он различает
+    пользователей. Last-Modified — время последнего сдвига поколения.
+    """
+    def etag(request, *args, **kwargs):
+        generations = request_generations(request, scopes(*args, **kwargs))
+        parts = [
+            f'{scope}={generations[scope]}' for scope in sorted(generations)
+        ]
+        parts.append(request.META.get('HTTP_COOKIE', ''))
+        return hashlib.md5('\n'.join(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        generations = request_generations(request, scopes(*args, **kwargs))
+        return datetime.fromtimestamp(
+            max(generations.values()) / 1e6, timezone.utc
+        )
+
+    def decorator(view):
+        conditional = condition(etag, last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                # Без no-cache браузер сам решит, сколько считать страницу
+                # свежей по Last-Modified, и не спросит сервер
+                patch_cache_control(response, no_cache=True)
+                patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache import SQLiteCache
+
+PARAMS = {'OPTIONS': {'MAX_ENTRIES': 1000000}}
+
+
+def make_backends(directory):
+    return {
+        'LocMemCache': lambda: LocMemCache('benchmark', PARAMS),
+        'FileBasedCache': lambda: FileBasedCache(
+            os.path.join(directory, 'files'), PARAMS
+        ),
+        'SQLiteCache': lambda: SQLiteCache(
+            os.path.join(directory, 'cache.sqlite3'), PARAMS
+        ),
+    }
+
+
+def timed(action, operations):
+    start = time.perf_counter()
+    action()
+    return operations / (time.perf_counter() - start)
+
+
+def read_keys(factory, keys, written, result):
+    """Доля попаданий в процессе, запущенном до записи, как воркер WSGI"""
+    cache = factory()
+    written.wait()
+    found = cache.get_many(keys)
+    result.put(len(found) / len(keys))
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает SQLiteCache с LocMemCache и FileBasedCache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        keys = [f'key{number}' for number in range(options['keys'])]
+        value = {'html': 'x' * 2000}
+        directory = tempfile.mkdtemp()
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(
+            f'{"бэкенд":<16}{"set/с":>10}{"get/с":>10}'
+            f'{"get_many/с":>12}{"incr/с":>10}{"попадания":>11}'
+        )
+        try:
+            for name, factory in make_backends(directory).items():
+                cache = factory()
+                cache.clear()
+                written = context.Event()
+                result = context.Queue()
+                workers = [
+                    context.Process(
+                        target=read_keys,
+                        args=(factory, keys, written, result),
+                    )
+                    for _ in range(options['workers'])
+                ]
+                for worker in workers:
+                    worker.start()
+                sets = timed(
+                    lambda: [cache.set(key, value) for key in keys],
+                    len(keys),
+                )
+                gets = timed(
+                    lambda: [cache.get(key) for key in keys], len(keys)
+                )
+                many = timed(
+                    lambda: [
+                        cache.get_many(keys[start:start + 10])
+                        for start in range(0, len(keys), 10)
+                    ],
+                    len(keys),
+                )
+                cache.set('counter', 0)
+                incrs = timed(
+                    lambda: [cache.incr('counter') for _ in keys], len(keys)
+                )
+                written.set()
+                hits = [result.get() for _ in workers]
+                for worker in workers:
+                    worker.join()
+                self.stdout.write(
+                    f'{name:<16}{sets:>10.0f}{gets:>10.0f}{many:>12.0f}'
+                    f'{incrs:>10.0f}{sum(hits) / len(hits):>11.0%}'
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
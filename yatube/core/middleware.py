@@ -0,0 +1,49 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .query_budget import (
+    QueryBudgetExceeded, QueryRecorder, get_budget, get_chunk_budget,
+    record_chunks,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """Считает SQL-запросы запроса и сверяет их с бюджетом представления"""
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_CHECK:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request.query_budget = None
+        request.query_budget_per_chunk = None
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        if settings.DEBUG:
+            response['X-Query-Count'] = len(recorder)
+        self.report(request, recorder.problems(request.query_budget))
+        if response.streaming:
+            # Запросы потокового ответа идут при его отдаче
+            response.streaming_content = record_chunks(
+                response.streaming_content, request.query_budget_per_chunk,
+                lambda problems: self.report(request, problems),
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_budget(view_func)
+        request.query_budget_per_chunk = get_chunk_budget(view_func)
+
+    def report(self, request, problems):
+        if not problems:
+            return
+        message = f'{request.path}: ' + '; '.join(problems)
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
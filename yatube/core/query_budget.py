@@ -0,0 +1,83 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+IN_LIST = re.compile(r'\((?:%s, )*%s\)')
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление сделало больше запросов, чем заявлено"""
+
+
+def query_budget(limit, per_chunk=None):
+    """Объявляет, сколько SQL-запросов может сделать представление
+
+    per_chunk — бюджет каждого куска потокового ответа: эти запросы идут
+    уже после выхода из представления, пока ответ отдаётся клиенту.
+    """
+    def decorator(view):
+        view.query_budget = limit
+        view.query_budget_per_chunk = per_chunk
+        return view
+    return decorator
+
+
+def get_budget(view):
+    return getattr(view, 'query_budget', None)
+
+
+def get_chunk_budget(view):
+    return getattr(view, 'query_budget_per_chunk', None)
+
+
+def shape(sql):
+    """Форма запроса: SQL без значений, списки IN схлопнуты"""
+    return IN_LIST.sub('(...)', sql)
+
+
+class QueryRecorder:
+    """Собирает выполненные запросы через connection.execute_wrapper"""
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, threshold=None):
+        """Формы запросов, повторённые не меньше threshold раз (N+1)"""
+        if threshold is None:
+            threshold = settings.QUERY_BUDGET_REPEAT_THRESHOLD
+        counts = Counter(shape(sql) for sql in self.queries)
+        return {sql: count for sql, count in counts.items()
+                if count >= threshold}
+
+    def problems(self, budget):
+        """Описания нарушений: превышение бюджета и повторы запросов"""
+        problems = []
+        if budget is not None and len(self) > budget:
+            problems.append(f'{len(self)} запросов при бюджете {budget}')
+        for sql, count in self.repeated().items():
+            problems.append(f'N+1: {count} раз {sql}')
+        return problems
+
+
+def record_chunks(content, budget, report):
+    """Отдаёт куски потокового ответа, считая запросы каждого отдельно:
+    нарушения бюджета куска передаются в report"""
+    iterator = iter(content)
+    while True:
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            chunk = next(iterator, None)
+        problems = recorder.problems(budget)
+        if problems:
+            report(problems)
+        if chunk is None:
+            return
+        yield chunk
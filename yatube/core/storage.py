@@ -0,0 +1,50 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def shard(directory, digest, extension=''):
+    """Путь вида directory/ab/cd/abcd…: в одном каталоге не больше 256 имён"""
+    return os.path.join(
+        directory, digest[:2], digest[2:4], digest + extension.lower()
+    )
+
+
+def file_digest(content):
+    sha256 = hashlib.sha256()
+    for chunk in content.chunks():
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы называются хэшем содержимого, одинаковые хранятся один раз
+
+    Из имени, предложенного полем, берутся только каталог upload_to
+    и расширение. Если файл с таким содержимым уже есть, он не
+    перезаписывается, и все загрузки получают одно имя, а значит,
+    и одни миниатюры.
+    """
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory, file_name = os.path.split(name)
+        name = shard(
+            directory, file_digest(content), os.path.splitext(file_name)[1]
+        )
+        if self.exists(name):
+            # Новая ссылка на старый файл: collect_media отсчитывает
+            # --grace от времени изменения, пока пост ещё не сохранён
+            os.utime(self.path(name))
+            return name
+        # При одновременной загрузке того же файла get_available_name
+        # даст запасное имя, и копия просто останется лишней
+        return self._save(
+            self.get_available_name(name, max_length=max_length), content
+        )
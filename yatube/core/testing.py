@@ -0,0 +1,32 @@
+from urllib.parse import urlsplit
+
+from django.db import connection
+from django.urls import resolve
+
+from .query_budget import (
+    QueryRecorder, get_budget, get_chunk_budget, record_chunks
+)
+
+
+class QueryBudgetTestMixin:
+    """Проверки бюджета запросов для TestCase"""
+    def assertWithinBudget(self, client, url, method='get', **kwargs):
+        view = resolve(urlsplit(url).path).func
+        budget = get_budget(view)
+        self.assertIsNotNone(budget, f'{url}: не объявлен бюджет запросов')
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = getattr(client, method)(url, **kwargs)
+        self.assertEqual(recorder.problems(budget), [], recorder.queries)
+        if response.streaming:
+            chunk_budget = get_chunk_budget(view)
+            self.assertIsNotNone(
+                chunk_budget, f'{url}: не объявлен бюджет куска ответа'
+            )
+            problems = []
+            content = b''.join(record_chunks(
+                response.streaming_content, chunk_budget, problems.extend
+            ))
+            self.assertEqual(problems, [])
+            response.streaming_content = [content]
+        return response
@@ -0,0 +1,81 @@
+import multiprocessing
+import shutil
+import tempfile
+import os
+
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+def increment(path, times):
+    cache = SQLiteCache(path, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    """Тестируем общий кэш на SQLite"""
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path, {
+            'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2},
+        })
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_set_get_delete(self):
+        """Обычные операции кэша"""
+        self.cache.set('text', {'a': 1})
+        self.cache.set('number', 5)
+        self.assertEqual(self.cache.get('text'), {'a': 1})
+        self.assertEqual(
+            self.cache.get_many(['text', 'number', 'missing']),
+            {'text': {'a': 1}, 'number': 5},
+        )
+        self.assertFalse(self.cache.add('number', 6))
+        self.assertTrue(self.cache.add('other', 6))
+        self.cache.delete('text')
+        self.assertIsNone(self.cache.get('text'))
+
+    def test_expired_value_is_missing(self):
+        """Просроченное значение не возвращается"""
+        self.cache.set('key', 'value', timeout=0)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_shared_between_instances(self):
+        """Значения видны другим экземплярам с тем же файлом"""
+        self.cache.set('key', 'value')
+        self.assertEqual(SQLiteCache(self.path, {}).get('key'), 'value')
+
+    def test_incr_is_atomic_across_processes(self):
+        """incr из нескольких процессов не теряет обновлений"""
+        self.cache.set('counter', 0)
+        workers = [
+            multiprocessing.Process(target=increment, args=(self.path, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняются давно не читанные записи"""
+        for number in range(64):
+            self.cache.set(f'key{number}', number)
+        self.cache._db.execute(
+            "UPDATE cache SET accessed = 0 WHERE key NOT LIKE '%key63'"
+        )
+        self.cache._cull()
+        self.assertEqual(self.cache.get('key63'), 63)
+        self.assertLessEqual(
+            len(self.cache.get_many(f'key{n}' for n in range(64))), 10
+        )
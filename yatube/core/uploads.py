@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class OversizedUpload(UploadedFile):
+    """Файл больше лимита: данные отброшены, известны имя и размер"""
+    def __init__(self, name, size, content_type=None, limit=None):
+        super().__init__(None, name, content_type, size)
+        self.limit = limit
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Отбрасывает файл, как только он перерос UPLOAD_MAX_SIZE
+
+    Стоит первым в FILE_UPLOAD_HANDLERS: пока лимит не превышен, отдаёт
+    данные следующим обработчикам, а после — дочитывает поток впустую
+    и вместо файла возвращает OversizedUpload, чтобы форма выдала ошибку.
+    """
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.UPLOAD_MAX_SIZE:
+            self.oversized = True
+        if self.oversized:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.oversized:
+            return OversizedUpload(
+                self.file_name, file_size, self.content_type,
+                settings.UPLOAD_MAX_SIZE,
+            )
+        return None
@@ -1,16 +1,110 @@
+from datetime import datetime
+
 from django.contrib import admin
+from django.core.cache import cache
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from core.generations import request_generations
+
+from . import search
+from .models import Comment, Follow, Group, Post
+from .utils.paginator import CachedCountPaginator
+
+
+class YearListFilter(admin.SimpleListFilter):
+    """Фильтр по году через диапазон pub_date, который идёт по индексу
+
+    date_hierarchy в SQLite строит список дат функцией над каждой строкой.
+    """
+    title = 'год публикации'
+    parameter_name = 'year'
+
+    def lookups(self, request, model_admin):
+        # Отдельные MIN и MAX SQLite берёт с края индекса
+        queryset = model_admin.model.objects.order_by()
+        first = queryset.aggregate(value=Min('pub_date'))['value']
+        last = queryset.aggregate(value=Max('pub_date'))['value']
+        if first is None:
+            return ()
+        years = range(
+            timezone.localtime(last).year, timezone.localtime(first).year - 1,
+            -1,
+        )
+        return [(str(year), str(year)) for year in years]
+
+    def queryset(self, request, queryset):
+        try:
+            year = int(self.value())
+            start = timezone.make_aware(datetime(year, 1, 1))
+            end = timezone.make_aware(datetime(year + 1, 1, 1))
+        except (TypeError, ValueError, OverflowError):
+            return queryset
+        return queryset.filter(pub_date__gte=start, pub_date__lt=end)
+
 
-from .models import Follow, Group, Post
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без полного COUNT(*) на каждый запрос"""
+    paginator = CachedCountPaginator
+    show_full_result_count = False
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('pub_date', YearListFilter)
+    raw_id_fields = ('author',)
     empty_value_display = '-пусто-'
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        field = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'group':
+            # Список групп один на все строки и живёт до изменения групп
+            field.choices = self.group_choices(request)
+        return field
+
+    def group_choices(self, request):
+        generation = request_generations(request, ('groups',))['groups']
+        key = f'admin_group_choices:{generation}'
+        choices = cache.get(key)
+        if choices is None:
+            choices = [('', '---------')] + list(
+                Group.objects.order_by('pk').values_list('pk', 'title')
+            )
+            cache.set(key, choices, None)
+        return choices
+
+    def get_search_results(self, request, queryset, search_term):
+        # Текст ищем по полнотекстовому индексу, а не LIKE по всей таблице
+        if not search.available() or not search.match_query(search_term):
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=search.matching_ids(search_term)), False
+
+
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('pk', 'text', 'pub_date', 'author', 'post', 'depth')
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('author', 'post', 'parent')
+    # По pub_date у комментариев нет отдельного индекса, а pk есть всегда
+    ordering = ('-pk',)
+
+
+class FollowAdmin(LargeTableAdmin):
+    list_display = ('pk', 'user', 'author', 'pub_date')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    ordering = ('-pk',)
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug', 'posts_count')
+    search_fields = ('title',)
+    prepopulated_fields = {'slug': ('title',)}
+
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
-admin.site.register(Follow)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,46 @@
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.safestring import mark_safe
+
+from yatube.settings import POST_CARD_TIMEOUT
+
+from .thumbnails import attach_thumbnails
+
+
+def card_key(post, template_name):
+    """Ключ карточки: версия поста и всё, что выводится об авторе и группе"""
+    author = post.author
+    group = post.group
+    parts = (
+        template_name, translation.get_language(),
+        post.pk, post.pub_date.isoformat(), post.version,
+        author.username, author.first_name, author.last_name,
+        group.slug if group else '', group.title if group else '',
+    )
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'post_card:{post.pk}:{digest}'
+
+
+def attach_cards(page_obj, template_name):
+    """Кладёт в post.card готовый HTML карточки, недостающие рендерит
+
+    Адреса миниатюр для недостающих карточек ищутся одной пачкой.
+    """
+    posts = list(page_obj.object_list)
+    page_obj.object_list = posts
+    keys = {card_key(post, template_name): post for post in posts}
+    cached = cache.get_many(list(keys))
+    missing = {key: post for key, post in keys.items() if key not in cached}
+    attach_thumbnails(missing.values(), 'card')
+    rendered = {
+        key: render_to_string(template_name, {'post': post})
+        for key, post in missing.items()
+    }
+    for key, post in keys.items():
+        post.card = mark_safe(cached.get(key, rendered.get(key)))
+    if rendered:
+        cache.set_many(rendered, POST_CARD_TIMEOUT)
+    return page_obj
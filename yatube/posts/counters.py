@@ -0,0 +1,113 @@
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+Counter = namedtuple('Counter', 'source key target field')
+
+COUNTERS = (
+    Counter(Post, 'author_id', UserStats, 'posts_count'),
+    Counter(Post, 'group_id', Group, 'posts_count'),
+    Counter(Comment, 'post_id', Post, 'comments_count'),
+    Counter(Follow, 'author_id', UserStats, 'followers_count'),
+    Counter(Follow, 'user_id', UserStats, 'following_count'),
+)
+
+
+def counters_for(model):
+    return [counter for counter in COUNTERS if counter.source is model]
+
+
+def apply(changes):
+    """Сдвигает счётчики: (counter, id, delta) одной модели собираются в
+    один UPDATE, разные поля и строки разводит CASE по id"""
+    grouped = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    for counter, target_id, delta in changes:
+        if target_id is not None:
+            grouped[counter.target][counter.field][target_id] += delta
+    for target, fields in grouped.items():
+        ids = {pk for deltas in fields.values() for pk in deltas}
+        if shift(target, fields, ids) == len(ids) or target is not UserStats:
+            continue
+        # Строки UserStats нет, пока пользователь ничего не делал
+        missing = ids - set(
+            UserStats.objects.filter(pk__in=ids).values_list('pk', flat=True)
+        )
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=pk) for pk in missing], ignore_conflicts=True
+        )
+        shift(target, fields, missing)
+
+
+def shift(target, fields, ids):
+    return target.objects.filter(pk__in=ids).update(**{
+        field: F(field) + Case(
+            *(When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        for field, deltas in fields.items()
+    })
+
+
+def remember(instance):
+    """Запоминает значения ключей, чтобы заметить их изменение при save"""
+    deferred = instance.get_deferred_fields()
+    instance._counter_keys = {
+        counter.key: getattr(instance, counter.key)
+        for counter in counters_for(type(instance))
+        if counter.key not in deferred
+    }
+
+
+def user_stats(user_id):
+    """Счётчики пользователя или нули, если он ещё ничего не делал"""
+    return (
+        UserStats.objects.filter(pk=user_id).first()
+        or UserStats(user_id=user_id)
+    )
+
+
+def recount(counter, ids):
+    """Пересчитывает счётчик для переданных id целевой модели"""
+    counts = dict(
+        counter.source.objects.filter(
+            **{f'{counter.key}__in': ids}
+        ).order_by().values_list(counter.key).annotate(Count('pk'))
+    )
+    targets = list(counter.target.objects.filter(pk__in=ids))
+    for target in targets:
+        setattr(target, counter.field, counts.get(target.pk, 0))
+    counter.target.objects.bulk_update(targets, [counter.field])
+
+
+def recount_all(chunk_size=1000, log=None):
+    """Пересчитывает все счётчики порциями по chunk_size объектов"""
+    user_ids = User.objects.values_list('pk', flat=True).order_by('pk')
+    for start in range(0, user_ids.count(), chunk_size):
+        UserStats.objects.bulk_create(
+            (
+                UserStats(user_id=user_id)
+                for user_id in user_ids[start:start + chunk_size]
+            ),
+            ignore_conflicts=True,
+        )
+    for counter in COUNTERS:
+        ids = counter.target.objects.values_list(
+            'pk', flat=True
+        ).order_by('pk')
+        last_id = 0
+        while True:
+            chunk = list(ids.filter(pk__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            with transaction.atomic():
+                recount(counter, chunk)
+            last_id = chunk[-1]
+            if log:
+                log(
+                    f'{counter.target.__name__}.{counter.field}: '
+                    f'до id {last_id}'
+                )
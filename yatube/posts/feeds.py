@@ -0,0 +1,119 @@
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+from core.generations import (
+    cache_page_by_generation, condition_by_generation
+)
+from core.query_budget import query_budget
+from yatube.settings import FEED_ITEMS, PAGE_CACHE_TIMEOUT
+
+from .models import Group, Post, User
+from .scopes import group_scopes, index_scopes, profile_scopes
+
+
+class PostsFeed(Feed):
+    """RSS последних постов сайта"""
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+
+    def link(self):
+        return reverse('posts:main_page')
+
+    def subtitle(self, obj):
+        # subtitle нужен Atom, RSS берёт description
+        return self._get_dynamic_attr('description', obj)
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return self.posts(obj).select_related(
+            'author', 'group'
+        )[:FEED_ITEMS]
+
+    def item_title(self, post):
+        return Truncator(post.text).chars(80)
+
+    def item_description(self, post):
+        # Читалки показывают описание как HTML: текст поста экранируем
+        return linebreaks(post.text, autoescape=True)
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=(post.pk,))
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_categories(self, post):
+        return (post.group.title,) if post.group else ()
+
+
+class GroupFeed(PostsFeed):
+    """RSS последних постов группы"""
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_posts_list', args=(group.slug,))
+
+    def posts(self, group):
+        return group.posts.all()
+
+
+class ProfileFeed(PostsFeed):
+    """RSS последних постов автора"""
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Записи автора {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=(author.username,))
+
+    def posts(self, author):
+        return author.posts.all()
+
+
+class AtomPostsFeed(PostsFeed):
+    feed_type = Atom1Feed
+
+
+class AtomGroupFeed(GroupFeed):
+    feed_type = Atom1Feed
+
+
+class AtomProfileFeed(ProfileFeed):
+    feed_type = Atom1Feed
+
+
+def feed_view(feed, scopes, budget):
+    """Лента как представление страницы: XML хранится в кэше до нового
+    поста, а повторный опрос читалкой получает 304"""
+    view = query_budget(budget)(feed)
+    view = cache_page_by_generation(PAGE_CACHE_TIMEOUT, scopes)(view)
+    return condition_by_generation(scopes)(view)
+
+
+posts_rss = feed_view(PostsFeed(), index_scopes, 1)
+posts_atom = feed_view(AtomPostsFeed(), index_scopes, 1)
+group_rss = feed_view(GroupFeed(), group_scopes, 2)
+group_atom = feed_view(AtomGroupFeed(), group_scopes, 2)
+profile_rss = feed_view(ProfileFeed(), profile_scopes, 2)
+profile_atom = feed_view(AtomProfileFeed(), profile_scopes, 2)
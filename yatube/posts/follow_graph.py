@@ -0,0 +1,321 @@
+"""Граф подписок в памяти процесса
+
+Подписки лежат в двух CSR-массивах id пользователей: строка u массива
+following — отсортированные id авторов, на которых подписан u, строка
+followers — его подписчики. Строка находится по indptr за O(1), подписка в
+ней — двоичным поиском, число подписок — разность соседних indptr. Массивы
+NumPy: сборка и слияние изменений векторные.
+
+Новые изменения копятся в множествах поверх массивов и после
+FOLLOW_GRAPH_COMPACT штук вливаются в них. Процессы синхронизирует журнал
+FollowEvent: сигнал пишет событие и сдвигает поколение 'follows', а процесс,
+заметив новое поколение, дочитывает журнал одним запросом по id.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+import numpy
+from django.db import connections, transaction
+
+from core.generations import bump, get_generations
+from yatube.settings import FOLLOW_GRAPH_COMPACT, FOLLOW_GRAPH_JOURNAL
+
+from .models import Follow, FollowEvent
+
+SCOPE = 'follows'
+CHUNK_SIZE = 10_000
+# Старые события журнала удаляются на каждом PRUNE_EVERY-м событии
+PRUNE_EVERY = 1000
+# id пользователей — 32 бита
+ID_TYPE = 'i'
+
+
+class Rows:
+    """CSR: соседи вершины v — indices[indptr[v]:indptr[v + 1]] по
+    возрастанию"""
+
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+        # Поштучное чтение через memoryview отдаёт int без обёрток NumPy и
+        # вдвое быстрее
+        self.offsets = memoryview(indptr)
+        self.values = memoryview(indices)
+
+    @classmethod
+    def build(cls, rows, columns, size):
+        """rows и columns — рёбра, упорядоченные по (row, column)"""
+        rows = numpy.asarray(rows, dtype=numpy.int32)
+        indptr = numpy.zeros(size + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(rows, minlength=size), out=indptr[1:])
+        return cls(indptr, numpy.asarray(columns, dtype=numpy.int32))
+
+    def transposed(self, size):
+        """Те же рёбра, развёрнутые: строки остаются упорядоченными, потому
+        что рёбра перебираются по возрастанию исходной строки"""
+        keys = pair_keys(self.indices, self.rows())
+        keys.sort()
+        return Rows.build(keys >> 32, keys & 0xFFFFFFFF, size)
+
+    def rows(self):
+        """Номер строки каждого ребра"""
+        return numpy.repeat(
+            numpy.arange(len(self.indptr) - 1, dtype=numpy.int64),
+            numpy.diff(self.indptr),
+        )
+
+    def bounds(self, vertex):
+        if not 0 <= vertex < len(self.offsets) - 1:
+            return 0, 0
+        return self.offsets[vertex], self.offsets[vertex + 1]
+
+    def degree(self, vertex):
+        start, end = self.bounds(vertex)
+        return end - start
+
+    def row(self, vertex):
+        start, end = self.bounds(vertex)
+        return self.indices[start:end].tolist()
+
+    def contains(self, vertex, other):
+        start, end = self.bounds(vertex)
+        position = bisect_left(self.values, other, start, end)
+        return position < end and self.values[position] == other
+
+    def contains_many(self, vertex, others):
+        """Те из others, что есть в строке: один векторный поиск на всех"""
+        start, end = self.bounds(vertex)
+        if start == end or not len(others):
+            return set()
+        row = self.indices[start:end]
+        others = numpy.asarray(others, dtype=numpy.int64)
+        positions = numpy.minimum(row.searchsorted(others), len(row) - 1)
+        return set(others[row[positions] == others].tolist())
+
+    def edges(self):
+        for row in range(len(self.indptr) - 1):
+            for column in self.row(row):
+                yield row, column
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes
+
+
+class FollowGraph:
+    """Подписки: массивы плюс ещё не влитые в них изменения"""
+
+    def __init__(self, users=(), authors=()):
+        """users и authors — пары подписок без повторов, упорядоченные по
+        (user, author)"""
+        users = numpy.asarray(users, dtype=numpy.int32)
+        authors = numpy.asarray(authors, dtype=numpy.int32)
+        size = 1 + max(
+            (int(values.max()) for values in (users, authors) if len(values)),
+            default=-1,
+        )
+        self.following = Rows.build(users, authors, size)
+        self.followers = self.following.transposed(size)
+        self.added = set()
+        self.removed = set()
+        self.following_delta = Counter()
+        self.followers_delta = Counter()
+
+    @classmethod
+    def load(cls):
+        """Все подписки одним проходом по уникальному индексу (user, author)"""
+        users, authors = array(ID_TYPE), array(ID_TYPE)
+        pairs = Follow.objects.order_by('user_id', 'author_id').values_list(
+            'user_id', 'author_id'
+        )
+        for user_id, author_id in pairs.iterator(chunk_size=CHUNK_SIZE):
+            users.append(user_id)
+            authors.append(author_id)
+        return cls(users, authors)
+
+    def is_following(self, user_id, author_id):
+        pair = (user_id, author_id)
+        if pair in self.added:
+            return True
+        if pair in self.removed:
+            return False
+        return self.following.contains(user_id, author_id)
+
+    def following_many(self, user_id, author_ids):
+        """Те из author_ids, на кого подписан user_id"""
+        found = self.following.contains_many(user_id, author_ids)
+        if self.added or self.removed:
+            for author_id in author_ids:
+                if (user_id, author_id) in self.added:
+                    found.add(author_id)
+                elif (user_id, author_id) in self.removed:
+                    found.discard(author_id)
+        return found
+
+    def following_count(self, user_id):
+        return (
+            self.following.degree(user_id) + self.following_delta[user_id]
+        )
+
+    def followers_count(self, author_id):
+        return (
+            self.followers.degree(author_id) + self.followers_delta[author_id]
+        )
+
+    def add(self, user_id, author_id):
+        if self.is_following(user_id, author_id):
+            return
+        pair = (user_id, author_id)
+        if pair in self.removed:
+            self.removed.discard(pair)
+        else:
+            self.added.add(pair)
+        self.following_delta[user_id] += 1
+        self.followers_delta[author_id] += 1
+
+    def remove(self, user_id, author_id):
+        if not self.is_following(user_id, author_id):
+            return
+        pair = (user_id, author_id)
+        if pair in self.added:
+            self.added.discard(pair)
+        else:
+            self.removed.add(pair)
+        self.following_delta[user_id] -= 1
+        self.followers_delta[author_id] -= 1
+
+    @property
+    def pending(self):
+        return len(self.added) + len(self.removed)
+
+    @property
+    def nbytes(self):
+        """Память массивов; изменения поверх них сюда не входят"""
+        return self.following.nbytes + self.followers.nbytes
+
+    def compacted(self):
+        """Новый граф, в массивы которого влиты все изменения"""
+        # Ключи упорядочены: удалённые находятся и новые встают на место
+        # двоичным поиском, без сортировки всех подписок
+        keys = pair_keys(self.following.rows(), self.following.indices)
+        if self.removed:
+            removed = pair_keys(*zip(*self.removed))
+            keys = numpy.delete(keys, keys.searchsorted(removed))
+        if self.added:
+            added = numpy.sort(pair_keys(*zip(*self.added)))
+            keys = numpy.insert(keys, keys.searchsorted(added), added)
+        return FollowGraph(keys >> 32, keys & 0xFFFFFFFF)
+
+
+def pair_keys(rows, columns):
+    """Пара (row, column) одним 64-битным числом: числа сортируются
+    так же, как пары, а сортировка чисел намного быстрее"""
+    rows = numpy.asarray(rows, dtype=numpy.int64)
+    return rows << 32 | numpy.asarray(columns, dtype=numpy.int64)
+
+
+class Replica:
+    """Граф этого процесса и событие журнала, до которого он дочитан"""
+
+    def __init__(self):
+        self.graph = None
+        self.generation = None
+        self.event = (0, None)
+        self.lock = threading.Lock()
+
+    def current(self):
+        """Граф со всеми изменениями. Пока поколение 'follows' прежнее, это
+        одно чтение из кэша без запросов к базе; после сдвига — запрос к
+        журналу, а первая сборка или перечитывание — ещё запрос подписок"""
+        generation = get_generations((SCOPE,))[SCOPE]
+        if self.graph is None or generation != self.generation:
+            with self.lock:
+                if self.graph is None or generation != self.generation:
+                    self.sync()
+                    self.generation = generation
+        return self.graph
+
+    def sync(self):
+        if self.graph is None:
+            return self.load()
+        last_pk, last_created = self.event
+        events = list(
+            FollowEvent.objects.filter(pk__gte=last_pk).order_by('pk')
+            .values_list('pk', 'created', 'action', 'user_id', 'author_id')
+        )
+        # Последнее прочитанное событие пропало или подменено (журнал
+        # обрезан, транзакция откатилась) — догонять не от чего
+        diverged = last_pk and (not events or events[0][:2] != self.event)
+        # Первое событие уже применено, если граф до него дочитан
+        fresh = events[1:] if last_pk else events
+        if diverged or any(
+            event[2] == FollowEvent.RELOAD for event in fresh
+        ):
+            return self.load(events[-1][:2] if events else (0, None))
+        graph = self.graph
+        for pk, created, action, user_id, author_id in fresh:
+            if action == FollowEvent.FOLLOW:
+                graph.add(user_id, author_id)
+            else:
+                graph.remove(user_id, author_id)
+        if events:
+            self.event = events[-1][:2]
+        if graph.pending >= FOLLOW_GRAPH_COMPACT:
+            self.graph = graph.compacted()
+
+    def load(self, event=None):
+        """Граф заново из Follow. Событие журнала берётся до подписок: всё,
+        что запишут между двумя запросами, будет применено повторно, а
+        повтор ничего не меняет"""
+        if event is None:
+            event = FollowEvent.objects.order_by('-pk').values_list(
+                'pk', 'created'
+            ).first() or (0, None)
+        self.event = event
+        self.graph = FollowGraph.load()
+
+
+replica = Replica()
+
+
+def current():
+    return replica.current()
+
+
+def warm():
+    """Собирает граф заранее, при старте процесса: иначе все подписки
+    читал бы первый запрос к профилю"""
+    replica.current()
+    # Соединение не должно перейти в дочерние процессы при fork
+    connections.close_all()
+
+
+def record(action, user_id=None, author_id=None):
+    """Пишет событие в журнал и сдвигает поколение графа"""
+    event = FollowEvent.objects.create(
+        action=action, user_id=user_id, author_id=author_id
+    )
+    if event.pk % PRUNE_EVERY == 0:
+        prune(event.pk - FOLLOW_GRAPH_JOURNAL)
+    bump(SCOPE)
+    # Процесс, дочитавший журнал до фиксации транзакции, событие ещё не
+    # видел: после фиксации поколение сдвигается ещё раз
+    transaction.on_commit(lambda: bump(SCOPE))
+
+
+def prune(boundary):
+    """Удаляет события до boundary. Последнее из них становится RELOAD:
+    процесс, не дочитавший журнал до границы, перечитает граф целиком"""
+    old = FollowEvent.objects.filter(pk__lte=boundary)
+    marker = old.order_by('-pk').values_list('pk', flat=True).first()
+    if marker is not None:
+        old.filter(pk__lt=marker).delete()
+        old.filter(pk=marker).update(action=FollowEvent.RELOAD)
+
+
+def reload():
+    """Графы всех процессов перечитают подписки целиком: после изменений в
+    обход сигналов, например bulk_create при импорте"""
+    record(FollowEvent.RELOAD)
@@ -1,5 +1,14 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
 
+from core.uploads import OversizedUpload
+from yatube.settings import (
+    IMAGE_FORMATS, IMAGE_MAX_DECODED_PIXELS, IMAGE_MAX_DIMENSION,
+    IMAGE_MAX_PIXELS,
+)
+
+from .images import DRAFT_FORMATS, downscale
 from .models import Post, Comment
 
 
@@ -8,6 +17,41 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('group', 'text', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Данные слишком большого файла не сохранены, проверять нечего
+        image = self.files.get('image')
+        self.oversized = image if isinstance(image, OversizedUpload) else None
+        if self.oversized is not None:
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if self.oversized is not None:
+            raise forms.ValidationError(
+                f'Файл больше {filesizeformat(self.oversized.limit)}'
+            )
+        if not isinstance(image, UploadedFile):
+            return image
+        # ImageField прочитал только заголовок: формат и размер уже известны
+        header = image.image
+        if header.format not in IMAGE_FORMATS:
+            raise forms.ValidationError(
+                f'Формат {header.format} не поддерживается'
+            )
+        width, height = header.size
+        # Без draft() картинка раскрывается в памяти в полный размер
+        max_pixels = (
+            IMAGE_MAX_PIXELS if header.format in DRAFT_FORMATS
+            else IMAGE_MAX_DECODED_PIXELS
+        )
+        if width * height > max_pixels:
+            raise forms.ValidationError(
+                f'Картинка {width}x{height} слишком большая'
+            )
+        return downscale(image, IMAGE_MAX_DIMENSION)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
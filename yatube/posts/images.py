@@ -0,0 +1,39 @@
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+# Форматы, которые draft() умеет декодировать сразу в уменьшенном виде
+DRAFT_FORMATS = ('JPEG',)
+
+
+def downscale(upload, max_dimension):
+    """Уменьшает загруженную картинку до max_dimension по длинной стороне
+
+    JPEG через draft() декодируется сразу в уменьшенном в 2–8 раз
+    масштабе, так что в памяти не бывает полноразмерного растра. Остальные
+    форматы раскрываются целиком, их размер ограничивает форма.
+    Поворот по EXIF применяется уже к уменьшенной картинке.
+    """
+    upload.seek(0)
+    image = Image.open(upload)
+    if (
+        max(image.size) <= max_dimension
+        or getattr(image, 'is_animated', False)
+    ):
+        upload.seek(0)
+        return upload
+    image_format = image.format
+    scale = max_dimension / max(image.size)
+    image.draft(
+        image.mode,
+        (round(image.width * scale), round(image.height * scale)),
+    )
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    image = ImageOps.exif_transpose(image)
+    output = BytesIO()
+    options = {'quality': 90} if image_format in ('JPEG', 'WEBP') else {}
+    image.save(output, image_format, **options)
+    return SimpleUploadedFile(
+        upload.name, output.getvalue(), upload.content_type
+    )
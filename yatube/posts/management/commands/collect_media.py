@@ -0,0 +1,75 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from posts.models import Post
+
+UPLOAD_TO = Post._meta.get_field('image').upload_to
+
+
+def walk(storage, directory):
+    """Все файлы каталога хранилища и его подкаталогов"""
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield os.path.join(directory, name)
+    for name in directories:
+        yield from walk(storage, os.path.join(directory, name))
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки, на которые не ссылается ни один пост, '
+        'вместе с их миниатюрами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=24 * 60 * 60,
+            help='не трогать файлы моложе стольких секунд: их пост может '
+                 'быть ещё не сохранён',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        deadline = timezone.now() - timedelta(seconds=options['grace'])
+        names = []
+        deleted = 0
+        for name in walk(storage, UPLOAD_TO.rstrip('/')):
+            names.append(name)
+            if len(names) >= options['chunk_size']:
+                deleted += self.sweep(storage, names, deadline, options)
+                names = []
+        if names:
+            deleted += self.sweep(storage, names, deadline, options)
+        self.stdout.write(self.style.SUCCESS(f'Удалено файлов: {deleted}'))
+
+    def sweep(self, storage, names, deadline, options):
+        """Удаляет из пачки файлы, на которые ссылается ноль постов"""
+        referenced = set(
+            Post.objects.filter(image__in=names).values_list(
+                'image', flat=True
+            )
+        )
+        deleted = 0
+        for name in names:
+            if name in referenced:
+                continue
+            if storage.get_modified_time(name) > deadline:
+                continue
+            # Пока шла пачка, файл могли загрузить заново: проверяем
+            # ссылки ещё раз прямо перед удалением
+            if Post.objects.filter(image=name).exists():
+                continue
+            if options['verbosity'] > 1:
+                self.stdout.write(name)
+            if not options['dry_run']:
+                default.kvstore.delete(ImageFile(name, storage))
+                storage.delete(name)
+            deleted += 1
+        return deleted
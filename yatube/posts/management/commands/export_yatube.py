@@ -0,0 +1,55 @@
+from contextlib import ExitStack
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии или подписки в JSONL или CSV '
+        'пачками по первичному ключу'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(transfer.MODELS))
+        parser.add_argument(
+            '--output', default='-', help='файл или - для stdout',
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='по умолчанию по расширению файла',
+        )
+        parser.add_argument(
+            '--user', help='только записи этого пользователя',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        path = options['output']
+        data_format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'jsonl'
+        )
+        queryset = transfer.MODELS[kind].objects.all()
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'Нет пользователя {options["user"]}')
+            queryset = queryset.filter(**{transfer.OWNERS[kind]: user})
+        chunks = transfer.export_chunks(
+            kind, queryset, chunk_size=options['chunk_size']
+        )
+        with ExitStack() as stack:
+            if path == '-':
+                write = partial(self.stdout.write, ending='')
+            else:
+                write = stack.enter_context(
+                    open(path, 'w', encoding='utf-8', newline='')
+                ).write
+            for text in transfer.render(kind, chunks, data_format):
+                write(text)
+        if path != '-':
+            self.stdout.write(self.style.SUCCESS(f'Готово: {path}'))
@@ -0,0 +1,129 @@
+import random
+import time
+import tracemalloc
+from array import array
+
+from django.core.management.base import BaseCommand
+
+from posts.follow_graph import FollowGraph
+from yatube.settings import FOLLOW_GRAPH_COMPACT, POSTS_PER_PAGE
+
+# Для оценки памяти множества кортежей хватает выборки
+SET_SAMPLE = 100_000
+
+
+class Command(BaseCommand):
+    help = (
+        'Память и скорость графа подписок в памяти на сгенерированных '
+        'подписках'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edges', type=int, default=10_000_000)
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--lookups', type=int, default=200_000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        users, authors = self.edges(
+            rng, options['users'], options['edges']
+        )
+        self.stdout.write(
+            f'Подписок: {len(users)}, пользователей: {options["users"]}, '
+            f'генерация {time.perf_counter() - started:.1f} с'
+        )
+        started = time.perf_counter()
+        graph = FollowGraph(users, authors)
+        self.stdout.write(
+            f'Сборка CSR: {time.perf_counter() - started:.1f} с, '
+            f'{graph.nbytes / 2 ** 20:.0f} МБ, '
+            f'{graph.nbytes / len(users):.1f} байт на подписку'
+        )
+        self.stdout.write(
+            'set кортежей (оценка): '
+            f'{self.set_bytes(users, authors) / 2 ** 20:.0f} МБ'
+        )
+
+        count = options['lookups']
+        # Половина пар — настоящие подписки, половина — случайные
+        pairs = []
+        for _ in range(count):
+            if rng.random() < 0.5:
+                edge = rng.randrange(len(users))
+                pairs.append((int(users[edge]), int(authors[edge])))
+            else:
+                pairs.append((
+                    rng.randrange(options['users']),
+                    rng.randrange(options['users']),
+                ))
+        self.measure(
+            'is_following', count,
+            lambda: [graph.is_following(*pair) for pair in pairs],
+        )
+        batches = [
+            (
+                pairs[start][0],
+                [author for _, author in pairs[start:start + POSTS_PER_PAGE]],
+            )
+            for start in range(0, count, POSTS_PER_PAGE)
+        ]
+        self.measure(
+            f'following_many по {POSTS_PER_PAGE}', len(batches),
+            lambda: [graph.following_many(*batch) for batch in batches],
+        )
+        self.measure(
+            'followers_count', count,
+            lambda: [graph.followers_count(author) for _, author in pairs],
+        )
+        changes = pairs[:FOLLOW_GRAPH_COMPACT]
+        self.measure(
+            'add', len(changes),
+            lambda: [graph.add(*pair) for pair in changes],
+        )
+        started = time.perf_counter()
+        graph.compacted()
+        self.stdout.write(
+            f'Слияние {graph.pending} изменений: '
+            f'{time.perf_counter() - started:.1f} с'
+        )
+
+    def edges(self, rng, users, edges):
+        """Пары (user, author) по возрастанию: у подписчика от 1 подписки,
+        авторы с малыми id популярнее, как в жизни"""
+        per_user = edges / users
+        user_ids, author_ids = array('i'), array('i')
+        for user_id in range(users):
+            if len(user_ids) >= edges:
+                break
+            degree = min(
+                int(rng.expovariate(1 / per_user)) + 1, users,
+                edges - len(user_ids),
+            )
+            followed = set()
+            while len(followed) < degree:
+                followed.add(int(users * rng.random() ** 3))
+            followed.discard(user_id)
+            for author_id in sorted(followed):
+                user_ids.append(user_id)
+                author_ids.append(author_id)
+        return user_ids, author_ids
+
+    def set_bytes(self, users, authors):
+        size = min(SET_SAMPLE, len(users))
+        tracemalloc.start()
+        sample = {(users[i], authors[i]) for i in range(size)}
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del sample
+        return used * len(users) / size
+
+    def measure(self, name, count, run):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{name:<24}{count / elapsed:>14,.0f} в секунду'
+            f'{elapsed / count * 1e6:>10.2f} мкс'
+        )
@@ -0,0 +1,81 @@
+import re
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+from yatube.settings import POSTS_PER_PAGE
+
+SIZE = re.compile(r'(?:\(min-width: (\d+)px\) )?(\d+)(px|vw)')
+
+
+def slot_width(sizes, viewport):
+    """Ширина картинки на странице по атрибуту sizes, как её считает браузер"""
+    for condition in sizes.split(','):
+        min_width, value, unit = SIZE.match(condition.strip()).groups()
+        if min_width is None or viewport >= int(min_width):
+            value = int(value)
+            return value if unit == 'px' else viewport * value / 100
+    return viewport
+
+
+def file_size(image, variant):
+    return default_storage.size(
+        thumbnails.thumbnail_file(image, variant).name
+    )
+
+
+class Command(BaseCommand):
+    help = 'Считает вес картинок первой страницы ленты до и после srcset'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--viewports', type=int, nargs='+', default=[360, 768, 1280],
+        )
+        parser.add_argument('--dpr', type=float, default=2.0)
+        parser.add_argument('--posts', type=int, default=POSTS_PER_PAGE)
+
+    def handle(self, *args, **options):
+        posts = [
+            post for post in Post.objects.exclude(image='')[
+                :options['posts']
+            ]
+            if default_storage.exists(post.image.name)
+        ]
+        if not posts:
+            self.stdout.write('Нет постов с картинками')
+            return
+        for post in posts:
+            thumbnails.generate(post.image)
+        fallback, *modern = thumbnails.variants('card')
+        sizes = thumbnails.THUMBNAILS['card'].sizes
+        original = sum(post.image.size for post in posts)
+        before = sum(file_size(post.image, fallback) for post in posts)
+        self.stdout.write(
+            f'Постов с картинками: {len(posts)}, оригиналы: '
+            f'{original // 1024} КБ, одна миниатюра '
+            f'{fallback.geometry}: {before // 1024} КБ'
+        )
+        if not thumbnails.FORMATS:
+            self.stdout.write('Pillow не умеет WebP и AVIF')
+            return
+        best = [
+            variant for variant in modern
+            if variant.format == thumbnails.FORMATS[0]
+        ]
+        self.stdout.write(
+            f'{"экран":>7}{"ширина":>8}{"до, КБ":>9}'
+            f'{thumbnails.FORMATS[0] + ", КБ":>11}{"экономия":>10}'
+        )
+        for viewport in options['viewports']:
+            needed = slot_width(sizes, viewport) * options['dpr']
+            variant = next(
+                (variant for variant in best if variant.width >= needed),
+                best[-1],
+            )
+            after = sum(file_size(post.image, variant) for post in posts)
+            self.stdout.write(
+                f'{viewport:>7}{variant.width:>8}{before // 1024:>9}'
+                f'{after // 1024:>11}{1 - after / before:>10.0%}'
+            )
@@ -0,0 +1,98 @@
+import sys
+import time
+from contextlib import ExitStack
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core.generations import bump
+from posts import counters, follow_graph, thumbnails, transfer
+from posts.scopes import SHARED
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии или подписки из JSONL или CSV '
+        'пачками, не читая файл в память целиком'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(transfer.MODELS))
+        parser.add_argument('path', help='файл или - для stdin')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='по умолчанию по расширению файла',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=10000,
+            help='строк в одной транзакции',
+        )
+        parser.add_argument(
+            '--defer-indexes', action='store_true',
+            help='строить индексы таблицы после загрузки, а не по ходу',
+        )
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='заводить неизвестных авторов, иначе пропускать их строки',
+        )
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='не пересчитывать счётчики и ленты после загрузки',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'jsonl'
+        )
+        importer = transfer.Importer(
+            options['kind'], create_users=options['create_users']
+        )
+        with ExitStack() as stack:
+            stream = (
+                sys.stdin if path == '-' else stack.enter_context(
+                    open(path, encoding='utf-8', newline='')
+                )
+            )
+            if options['defer_indexes']:
+                stack.enter_context(
+                    transfer.deferred_indexes(importer.model)
+                )
+            started = time.monotonic()
+            records = transfer.read_records(stream, data_format)
+            try:
+                for chunk in transfer.chunks(records, options['chunk_size']):
+                    importer.load(chunk)
+                    self.report(importer, started)
+            except (KeyError, ValueError) as error:
+                raise CommandError(
+                    f'Ошибка после {importer.imported} строк: {error}'
+                )
+            importer.finish()
+            self.stdout.write('Индексы и счётчик id…')
+        self.report(importer, started)
+        if importer.skipped:
+            self.stdout.write(f'Пропущено строк: {importer.skipped}')
+        if not options['no_rebuild']:
+            self.rebuild(importer)
+        if importer.kind == 'follows':
+            # Графы подписок в памяти процессов сигналов тоже не видели
+            follow_graph.reload()
+        bump(*SHARED)
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def report(self, importer, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'Загружено строк: {importer.imported}, '
+            f'{importer.imported / max(elapsed, 1e-6):.0f} строк/с'
+        )
+
+    def rebuild(self, importer):
+        """bulk_create не шлёт сигналов: счётчики, ленты и очередь миниатюр
+        восстанавливаются отдельно"""
+        counters.recount_all()
+        if importer.kind in ('posts', 'follows'):
+            call_command('rebuild_timelines', stdout=self.stdout)
+        if importer.with_images:
+            thumbnails.enqueue_all()
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import Follow, Timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'user_ids', nargs='*', type=int,
+            help='id пользователей, по умолчанию все подписчики',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        if not user_ids:
+            followers = Follow.objects.values_list('user_id', flat=True)
+            readers = Timeline.objects.values_list('user_id', flat=True)
+            user_ids = sorted(
+                set(followers.distinct()) | set(readers.distinct())
+            )
+        chunk_size = options['chunk_size']
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            timeline.rebuild(chunk)
+            self.stdout.write(
+                f'Пересобрано лент: {start + len(chunk)} из {len(user_ids)}'
+            )
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,115 @@
+import itertools
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.search import match_query
+
+SYLLABLES = [
+    consonant + vowel for consonant in 'бвгдзклмнпрстх' for vowel in 'аеиоу'
+]
+
+
+def words(rng, count):
+    return [
+        ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        for _ in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает поиск LIKE и FTS5 на сгенерированных постах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = words(rng, 50_000)
+        # Частоты слов как в естественном языке: немногие слова частые
+        weights = list(itertools.accumulate(
+            1 / rank for rank in range(1, len(vocabulary) + 1)
+        ))
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'search.sqlite3')
+        db = sqlite3.connect(path)
+        try:
+            self.fill(db, rng, vocabulary, weights, options['posts'])
+            # Частые слова LIKE находит, не дочитав таблицу, а редкие —
+            # только полным просмотром
+            bands = {
+                'частые': rng.sample(vocabulary[100:2000], options['queries']),
+                'редкие': rng.sample(vocabulary[20000:], options['queries']),
+            }
+            self.stdout.write(
+                f'{"слова":<8}{"способ":<8}{"мс на запрос":>14}'
+                f'{"найдено в среднем":>20}'
+            )
+            for band, terms in bands.items():
+                like = self.measure(
+                    db, terms,
+                    'SELECT id FROM post WHERE text LIKE ? '
+                    'ORDER BY id DESC LIMIT 10',
+                    lambda term: f'%{term}%',
+                    'SELECT COUNT(*) FROM post WHERE text LIKE ?',
+                )
+                self.report(band, 'LIKE', like)
+                fts = self.measure(
+                    db, terms,
+                    'SELECT rowid FROM post_fts WHERE post_fts MATCH ? '
+                    'ORDER BY bm25(post_fts) LIMIT 10',
+                    match_query,
+                    'SELECT COUNT(*) FROM post_fts WHERE post_fts MATCH ?',
+                )
+                self.report(band, 'FTS5', fts)
+        finally:
+            db.close()
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+
+    def fill(self, db, rng, vocabulary, weights, count):
+        start = time.perf_counter()
+        db.execute('CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT)')
+        db.execute(
+            "CREATE VIRTUAL TABLE post_fts USING fts5(text, content='post', "
+            "content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        chunk = 50_000
+        for offset in range(0, count, chunk):
+            db.executemany(
+                'INSERT INTO post (text) VALUES (?)',
+                (
+                    (' '.join(rng.choices(
+                        vocabulary, cum_weights=weights, k=rng.randint(5, 40)
+                    )),)
+                    for _ in range(min(chunk, count - offset))
+                ),
+            )
+        db.execute("INSERT INTO post_fts(post_fts) VALUES ('rebuild')")
+        db.commit()
+        self.stdout.write(
+            f'Постов: {count}, подготовка {time.perf_counter() - start:.1f} с'
+        )
+
+    def measure(self, db, terms, sql, parameter, count_sql):
+        elapsed = 0
+        found = 0
+        for term in terms:
+            start = time.perf_counter()
+            db.execute(sql, (parameter(term),)).fetchall()
+            elapsed += time.perf_counter() - start
+            found += db.execute(count_sql, (parameter(term),)).fetchone()[0]
+        return elapsed / len(terms) * 1000, found / len(terms)
+
+    def report(self, band, name, result):
+        milliseconds, found = result
+        self.stdout.write(
+            f'{band:<8}{name:<8}{milliseconds:>14.2f}{found:>20.0f}'
+        )
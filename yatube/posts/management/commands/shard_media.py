@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.generations import bump
+from posts.models import Post, ThumbnailTask
+from posts.scopes import SHARED
+
+# Имена, уже разложенные по каталогам: posts/ab/cd/…
+SHARDED = r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/'
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки из плоского каталога posts/ в posts/ab/cd/ '
+        'и переписывает Post.image; можно прервать и запустить снова'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument(
+            '--keep-old', action='store_true',
+            help='не удалять старые файлы (их потом соберёт collect_media)',
+        )
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        flat = Post.objects.exclude(image='').exclude(image__regex=SHARDED)
+        last_id = 0
+        moved = 0
+        while True:
+            chunk = list(
+                flat.filter(pk__gt=last_id).order_by('pk').values_list(
+                    'pk', 'image'
+                )[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            renames = {}
+            for _, name in chunk:
+                if name in renames:
+                    continue
+                if not storage.exists(name):
+                    self.stderr.write(f'Нет файла {name}, пропускаю')
+                    continue
+                with storage.open(name) as content:
+                    renames[name] = storage.save(name, content)
+            if renames:
+                self.rename(renames)
+                # Ссылки на картинки есть на любой странице
+                bump(*SHARED)
+                moved += len(renames)
+                if not options['keep_old']:
+                    for name in renames:
+                        default.kvstore.delete(ImageFile(name, storage))
+                        storage.delete(name)
+            self.stdout.write(f'Перенесено файлов: {moved}, до id {last_id}')
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    @transaction.atomic
+    def rename(self, renames):
+        """Один UPDATE на пачку: новые имена, версии для карточек, очередь"""
+        posts = Post.objects.filter(image__in=list(renames))
+        post_ids = list(posts.values_list('pk', flat=True))
+        posts.update(
+            image=Case(
+                *(When(image=old, then=Value(new))
+                  for old, new in renames.items()),
+                output_field=models.CharField(),
+            ),
+            version=F('version') + 1,
+        )
+        ThumbnailTask.objects.bulk_create(
+            [ThumbnailTask(post_id=post_id) for post_id in post_ids],
+            ignore_conflicts=True,
+        )
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры загруженных картинок вне запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='пауза в секундах, когда очередь пуста',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='разобрать очередь и выйти',
+        )
+        parser.add_argument(
+            '--enqueue-all', action='store_true',
+            help='сначала поставить в очередь все посты с картинками',
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue_all']:
+            thumbnails.enqueue_all()
+        while True:
+            done = thumbnails.process_queue(options['batch_size'])
+            if done and options['verbosity'] > 1:
+                self.stdout.write(f'Взято задач: {done}')
+            if options['once'] and not done:
+                break
+            if not done:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.19 on 2026-10-18 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_comment_threads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.PositiveSmallIntegerField(choices=[(1, 'подписка'), (2, 'отписка'), (3, 'перечитать граф')], verbose_name='Действие')),
+                ('user_id', models.PositiveIntegerField(null=True, verbose_name='Подписчик')),
+                ('author_id', models.PositiveIntegerField(null=True, verbose_name='Автор')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ('pk',),
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.19 on 2026-10-18 03:17
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_follow_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnailtask',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Попыток'),
+        ),
+        migrations.AddField(
+            model_name='thumbnailtask',
+            name='available',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Доступна с'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 
 from core.models import CreatedModel
+from core.storage import ContentAddressedStorage
 
 
 User = get_user_model()
@@ -28,8 +30,30 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=1,
+        editable=False,
+    )
+
+    class Meta(CreatedModel.Meta):
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_date_idx'),
+            models.Index(
+                fields=['author', 'pub_date'], name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=['group', 'pub_date'], name='post_group_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -41,6 +65,11 @@ class Group(models.Model):
     slug = models.SlugField(max_length=255, unique=True, db_index=True,
                             verbose_name="URL")
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False,
+    )
 
     def __str__(self) -> str:
         return self.title
@@ -61,6 +90,34 @@ class Comment(CreatedModel):
     text = models.TextField(
         verbose_name='картинка',
     )
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+        verbose_name='ответ на',
+    )
+    # Путь от корня ветки: сортировка по нему даёт ветки в порядке показа,
+    # а поддерево — диапазон строк по индексу (post, path)
+    path = models.CharField(
+        'Путь в ветке',
+        max_length=255,
+        default='',
+        editable=False,
+    )
+    depth = models.PositiveSmallIntegerField(
+        'Глубина',
+        default=0,
+        editable=False,
+    )
+
+    class Meta(CreatedModel.Meta):
+        indexes = [
+            models.Index(
+                fields=['post', 'path'], name='comment_post_path_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -78,3 +135,100 @@ class Follow(CreatedModel):
         on_delete=models.CASCADE,
         related_name='following'
     )
+
+    class Meta(CreatedModel.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='follow_unique_user_author'
+            ),
+        ]
+
+
+class FollowEvent(models.Model):
+    """Журнал изменений подписок, по нему догоняют графы в памяти
+    процессов (posts.follow_graph)"""
+    FOLLOW = 1
+    UNFOLLOW = 2
+    RELOAD = 3
+    ACTIONS = (
+        (FOLLOW, 'подписка'),
+        (UNFOLLOW, 'отписка'),
+        (RELOAD, 'перечитать граф'),
+    )
+    action = models.PositiveSmallIntegerField('Действие', choices=ACTIONS)
+    # Не ForeignKey: отписки удалённого пользователя должны остаться
+    user_id = models.PositiveIntegerField('Подписчик', null=True)
+    author_id = models.PositiveIntegerField('Автор', null=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('pk',)
+
+    def __str__(self):
+        return f'{self.get_action_display()} {self.user_id} → {self.author_id}'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляются сигналами"""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    def __str__(self):
+        return f'Счётчики {self.user_id}'
+
+
+class Timeline(models.Model):
+    """Лента подписок: копия поста для каждого подписчика автора"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    pub_date = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date'], name='timeline_user_date_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='timeline_unique_user_post'
+            ),
+        ]
+
+
+class ThumbnailTask(models.Model):
+    """Очередь на создание миниатюр, её разбирает thumbnail_worker"""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='thumbnail_task',
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    # Взятая воркером задача до этого времени не выдаётся другим: если
+    # воркер упал, задачу возьмут снова
+    available = models.DateTimeField('Доступна с', default=timezone.now)
+
+    class Meta:
+        ordering = ('pk',)
+
+    def __str__(self):
+        return f'Миниатюры поста {self.post_id}'
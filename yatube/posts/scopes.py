@@ -0,0 +1,54 @@
+"""Области кэша страниц, сбрасываются сигналами при изменении данных"""
+from django.core.cache import cache
+
+from .models import Post
+
+SHARED = ('users', 'groups')
+# Сдвигается при каждом комментарии: от неё зависят только ленты API,
+# где у каждого поста есть число комментариев
+COMMENTS = 'comments'
+
+
+def index_scopes():
+    return ('posts', *SHARED)
+
+
+def group_scopes(slug):
+    return (f'group:{slug}', *SHARED)
+
+
+def profile_scopes(username):
+    return (f'profile:{username}', *SHARED)
+
+
+def post_scopes(post_id):
+    return (f'post:{post_id}', *SHARED)
+
+
+def post_page_scopes(post_id):
+    """Страница поста показывает и число постов автора"""
+    return (*post_scopes(post_id), f'author:{post_author(post_id)}')
+
+
+def author_key(post_id):
+    return f'post-author:{post_id}'
+
+
+def post_author(post_id):
+    """id автора поста из кэша: он меняется только в админке, а тогда
+    сигнал удаляет ключ"""
+    author_id = cache.get(author_key(post_id))
+    if author_id is None:
+        author_id = Post.objects.filter(pk=post_id).order_by().values_list(
+            'author_id', flat=True
+        ).first()
+        if author_id is not None:
+            cache.set(author_key(post_id), author_id, None)
+    return author_id
+
+
+def with_comments(scopes):
+    """Области ленты API: те же, что у страницы, и число комментариев"""
+    def feed_scopes(*args, **kwargs):
+        return (*scopes(*args, **kwargs), COMMENTS)
+    return feed_scopes
@@ -0,0 +1,131 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+TABLE = 'posts_post_fts'
+POSTS = Post._meta.db_table
+# Миграция, которая создаёт индекс
+MIGRATION = '0014_post_search'
+# Индекс FTS5 с внешним содержимым хранит только индекс, тексты остаются
+# в posts_post; триггеры обновляют его при любых INSERT, UPDATE и DELETE,
+# включая bulk_create и QuerySet.update()
+TRIGGERS = {
+    f'{TABLE}_insert': (
+        f'AFTER INSERT ON {POSTS} BEGIN'
+        f' INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);'
+        f' END'
+    ),
+    f'{TABLE}_delete': (
+        f'AFTER DELETE ON {POSTS} BEGIN'
+        f" INSERT INTO {TABLE}({TABLE}, rowid, text)"
+        f" VALUES ('delete', old.id, old.text);"
+        f' END'
+    ),
+    f'{TABLE}_update': (
+        f'AFTER UPDATE OF text ON {POSTS} BEGIN'
+        f" INSERT INTO {TABLE}({TABLE}, rowid, text)"
+        f" VALUES ('delete', old.id, old.text);"
+        f' INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);'
+        f' END'
+    ),
+}
+# Метки подсветки: в тексте их не бывает, а HTML экранируется до замены
+MARK_START, MARK_END = '\x02', '\x03'
+MAX_WORDS = 8
+WORD = re.compile(r'\w+')
+
+
+def available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install(using=connection):
+    """Создаёт индекс и триггеры, если их нет, и тогда же наполняет индекс
+
+    Django пересоздаёт таблицу SQLite при изменении её полей и теряет
+    триггеры, поэтому функция вызывается и после каждой миграции.
+    """
+    if not available(using):
+        return
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+            " AND name LIKE %s",
+            [f'{TABLE}%'],
+        )
+        existing = {name for name, in cursor.fetchall()}
+        missing = [name for name in TRIGGERS if name not in existing]
+        if TABLE in existing and not missing:
+            return
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+            f"text, content='{POSTS}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        )
+        for name in missing:
+            cursor.execute(f'CREATE TRIGGER {name} {TRIGGERS[name]}')
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+
+
+def uninstall(using=connection):
+    if not available(using):
+        return
+    with using.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+def match_query(text):
+    """Запрос FTS5 из ввода пользователя: слова в кавычках, последнее —
+    префикс, чтобы находилось и недописанное слово"""
+    words = WORD.findall(text.lower())[:MAX_WORDS]
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def matching_ids(text):
+    """Подзапрос id подходящих постов для фильтра pk__in"""
+    return RawSQL(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+        [match_query(text)],
+    )
+
+
+def search_posts(text, queryset=None):
+    """Посты по релевантности bm25, с фрагментом текста в search_snippet"""
+    if queryset is None:
+        queryset = Post.objects.all()
+    if not match_query(text):
+        return queryset.none()
+    if not available():
+        return queryset.filter(text__icontains=text).extra(
+            select={'search_snippet': 'text'}
+        )
+    return queryset.extra(
+        tables=[TABLE],
+        where=[f'{TABLE}.rowid = {POSTS}.id', f'{TABLE} MATCH %s'],
+        params=[match_query(text)],
+        select={
+            'search_rank': f'bm25({TABLE})',
+            'search_snippet': f"snippet({TABLE}, 0, %s, %s, '…', 32)",
+        },
+        select_params=[MARK_START, MARK_END],
+    ).order_by('search_rank', '-pub_date')
+
+
+def highlight(snippet):
+    """HTML фрагмента с найденными словами в <mark>"""
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
@@ -0,0 +1,208 @@
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import (
+    post_delete, post_init, post_migrate, post_save, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.generations import bump
+
+from . import counters, follow_graph, search, threads, timeline
+from .models import (
+    Comment, Follow, FollowEvent, Group, Post, ThumbnailTask, User,
+    UserStats,
+)
+from .scopes import COMMENTS, author_key
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    counters.remember(instance)
+    if 'image' not in instance.get_deferred_fields():
+        instance._image_name = instance.image.name
+
+
+@receiver(pre_save, sender=Post)
+def bump_version(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance.version += 1
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, raw=False, created=None,
+                          **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_counter_keys', {})
+    group_ids = {instance.group_id, previous.get('group_id')}
+    slugs = Group.objects.filter(pk__in=group_ids - {None}).values_list(
+        'slug', flat=True
+    )
+    username = User.objects.filter(pk=instance.author_id).values_list(
+        'username', flat=True
+    ).first()
+    scopes = [
+        'posts',
+        f'post:{instance.pk}',
+        f'profile:{username}',
+        *(f'group:{slug}' for slug in slugs),
+    ]
+    # created is None у post_delete
+    author_ids = {instance.author_id, previous.get('author_id')} - {None}
+    if created is not False or author_ids != {instance.author_id}:
+        # Число постов автора есть на странице каждого его поста
+        scopes.extend(f'author:{author_id}' for author_id in author_ids)
+        cache.delete(author_key(instance.pk))
+    bump(*scopes)
+
+
+@receiver(pre_save, sender=Comment)
+def place_comment(sender, instance, raw=False, **kwargs):
+    if not raw and instance._state.adding:
+        threads.place(instance)
+
+
+@receiver(post_save, sender=Comment)
+def set_comment_path(sender, instance, created, raw=False, **kwargs):
+    # Сегмент пути — id, поэтому путь известен только после INSERT
+    if created and not raw:
+        instance.path = threads.path_for(instance)
+        sender.objects.filter(pk=instance.pk).update(path=instance.path)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump(f'post:{instance.post_id}', COMMENTS)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    scopes = [
+        f'profile:{username}' for username in User.objects.filter(
+            pk__in=(instance.user_id, instance.author_id)
+        ).values_list('username', flat=True)
+    ]
+    # Внутри транзакции get_or_create читатель успел бы закэшировать
+    # старый профиль уже под новым поколением
+    transaction.on_commit(lambda: bump(*scopes))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_pages(sender, instance, update_fields=None, **kwargs):
+    # Вход в систему обновляет только last_login, страницы от него не зависят
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        bump('users')
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    # Строка счётчиков с первого дня: сигналам не приходится её заводить
+    if created and not raw:
+        UserStats.objects.bulk_create(
+            [UserStats(user=instance)], ignore_conflicts=True
+        )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, **kwargs):
+    bump('groups')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Follow)
+def update_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_counter_keys', {})
+    changes = []
+    for counter in counters.counters_for(sender):
+        current = getattr(instance, counter.key)
+        if created:
+            changes.append((counter, current, 1))
+        elif previous.get(counter.key, current) != current:
+            changes.append((counter, previous[counter.key], -1))
+            changes.append((counter, current, 1))
+    counters.apply(changes)
+    if sender is Post:
+        counters.remember(instance)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Follow)
+def decrease_counters(sender, instance, **kwargs):
+    counters.apply(
+        (counter, getattr(instance, counter.key), -1)
+        for counter in counters.counters_for(sender)
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.remove(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def journal_follow(sender, instance, created, **kwargs):
+    if created:
+        follow_graph.record(
+            FollowEvent.FOLLOW, instance.user_id, instance.author_id
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def journal_unfollow(sender, instance, **kwargs):
+    follow_graph.record(
+        FollowEvent.UNFOLLOW, instance.user_id, instance.author_id
+    )
+
+
+@receiver(post_save, sender=Post)
+def enqueue_thumbnails(sender, instance, created, raw=False, **kwargs):
+    if raw or 'image' in instance.get_deferred_fields():
+        return
+    name = instance.image.name
+    if name and (created or name != getattr(instance, '_image_name', None)):
+        # Задача прежней картинки могла исчерпать попытки: начинаем заново
+        reset = not created and ThumbnailTask.objects.filter(
+            post=instance
+        ).update(attempts=0, available=timezone.now())
+        if not reset:
+            ThumbnailTask.objects.bulk_create(
+                [ThumbnailTask(post=instance)], ignore_conflicts=True
+            )
+    instance._image_name = name
+
+
+@receiver(post_migrate)
+def install_search(sender, using, **kwargs):
+    if sender.name != 'posts':
+        return
+    # post_migrate приходит и после migrate других приложений, а таблицы
+    # постов может ещё не быть или индекс откатили вместе с 0014
+    connection = connections[using]
+    applied = MigrationRecorder(connection).applied_migrations()
+    if ('posts', search.MIGRATION) in applied:
+        search.install(connection)
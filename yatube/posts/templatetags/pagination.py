@@ -0,0 +1,10 @@
+from django import template
+
+from posts.utils.paginator import page_window as get_page_window
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page, on_each_side=2):
+    return get_page_window(page, on_each_side)
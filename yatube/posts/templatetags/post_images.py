@@ -0,0 +1,16 @@
+from django import template
+
+from posts.thumbnails import THUMBNAILS, attach_thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post, name):
+    """Готовые варианты миниатюры из очереди воркера или оригинал картинки
+
+    Если представление уже нашло адреса пачкой, берём их.
+    """
+    if not hasattr(post, 'thumbnail_url'):
+        attach_thumbnails([post], name)
+    return {'post': post, 'sizes': THUMBNAILS[name].sizes}
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TestAdminChangelist(TestCase):
+    """Список в админке не дорожает с ростом таблицы"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='admin', is_staff=True, is_superuser=True
+        )
+        cls.groups = [
+            Group.objects.create(title=f'Группа {number}', slug=f'g{number}')
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        start = User.objects.count()
+        authors = [
+            User.objects.create(username=f'author-{start + number}')
+            for number in range(count)
+        ]
+        Post.objects.bulk_create(
+            Post(
+                text='Пост', author=author,
+                group=self.groups[number % len(self.groups)],
+            )
+            for number, author in enumerate(authors)
+        )
+        posts = Post.objects.order_by('-pk')[:count]
+        Comment.objects.bulk_create(
+            Comment(post=post, author=post.author, text='Да')
+            for post in posts
+        )
+        Follow.objects.bulk_create(
+            Follow(user=self.admin, author=author) for author in authors
+        )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        for model in (Post, Comment, Follow):
+            url = reverse(f'admin:posts_{model._meta.model_name}_changelist')
+            with self.subTest(model=model.__name__):
+                self.add_rows(3)
+                cache.clear()
+                few = self.count_queries(url)
+                self.add_rows(40)
+                cache.clear()
+                self.assertEqual(self.count_queries(url), few)
+
+    def test_count_and_group_choices_are_cached(self):
+        self.add_rows(3)
+        url = reverse('admin:posts_post_changelist')
+        first = self.count_queries(url)
+        self.assertEqual(self.count_queries(url), first - 2)
+        response = self.client.get(url)
+        self.assertContains(response, 'Группа 4')
+
+        group = Group.objects.create(title='Новая группа', slug='new')
+        self.assertContains(self.client.get(url), 'Новая группа')
+        group.delete()
+
+    def test_year_filter(self):
+        self.add_rows(2)
+        old = Post.objects.order_by('pk').first()
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.make_aware(datetime(2001, 6, 1))
+        )
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url)
+        self.assertContains(response, '?year=2001')
+        response = self.client.get(url, {'year': '2001'})
+        self.assertEqual(list(response.context['cl'].result_list), [old])
+        response = self.client.get(url, {'year': 'abc'})
+        self.assertEqual(len(response.context['cl'].result_list), 2)
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import translation
+
+from core.generations import bump
+from posts.cards import card_key
+from posts.models import Group, Post
+
+User = get_user_model()
+
+TEMPLATE = 'posts/includes/group_list.html'
+
+
+class PostCardCacheTest(TestCase):
+    """Тестируем кэш карточек постов"""
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.authorized = Client()
+        cls.authorized.force_login(cls.user)
+        cls.group = Group.objects.create(
+            title='Тестовое имя',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self) -> None:
+        cache.clear()
+        # Страницы рендерятся на языке проекта, ключ карточки от него зависит
+        translation.activate(settings.LANGUAGE_CODE)
+        self.post = Post.objects.create(
+            text='Тестовая запись', author=self.user, group=self.group
+        )
+        self.address = reverse(
+            'posts:group_posts_list', kwargs={'slug': self.group.slug}
+        )
+
+    def test_card_is_cached(self):
+        """Карточка рендерится один раз и берётся из кэша"""
+        self.authorized.get(self.address)
+        key = card_key(self.post, TEMPLATE)
+        self.assertIn('Тестовая запись', cache.get(key))
+        cache.set(key, 'из кэша')
+        # Сбрасываем кэш страницы группы, но не кэш карточек
+        bump(f'group:{self.group.slug}')
+        response = self.authorized.get(self.address)
+        self.assertContains(response, 'из кэша')
+
+    def test_edit_bumps_version(self):
+        """Редактирование поста меняет ключ карточки"""
+        old_key = card_key(self.post, TEMPLATE)
+        self.authorized.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={'text': 'Новый текст', 'group': self.group.id},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+        self.assertNotEqual(card_key(self.post, TEMPLATE), old_key)
+        response = self.authorized.get(self.address)
+        self.assertContains(response, 'Новый текст')
+
+    def test_author_rename_changes_card(self):
+        """Переименование автора меняет ключ карточки"""
+        self.authorized.get(self.address)
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = 'Иван'
+        author.save()
+        response = self.authorized.get(self.address)
+        self.assertContains(response, 'Иван')
@@ -0,0 +1,203 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import QueryBudgetTestMixin
+from posts import threads
+from posts.models import Comment, Post
+from yatube.settings import COMMENT_MAX_DEPTH, COMMENTS_PER_PAGE
+
+User = get_user_model()
+MORE = re.compile(r'href="([^"]*/comments/\?after=[^"]+)"')
+
+
+class TestCommentPages(QueryBudgetTestMixin, TestCase):
+    """Комментарии поста отдаются страницами по курсору"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Вирусный пост', author=cls.author)
+        cls.quiet = Post.objects.create(text='Тихий пост', author=cls.author)
+        start = timezone.now()
+        for number in range(COMMENTS_PER_PAGE * 2 + 5):
+            commenter = User.objects.create_user(username=f'reader{number}')
+            Comment.objects.create(
+                post=cls.post, author=commenter, text=f'Комментарий {number}'
+            )
+        # Одинаковые даты: порядок держится на id
+        Comment.objects.update(pub_date=start)
+        Comment.objects.create(post=cls.quiet, author=cls.author, text='Один')
+        cls.newest_first = list(
+            Comment.objects.filter(post=cls.post).order_by('-pk')
+            .values_list('text', flat=True)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def detail(self, post):
+        return reverse('posts:post_detail', args=(post.pk,))
+
+    def test_detail_shows_first_page(self):
+        """Первая страница — новые комментарии, как и до пагинации"""
+        response = self.client.get(self.detail(self.post))
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            self.newest_first[:COMMENTS_PER_PAGE],
+        )
+        self.assertContains(response, 'Показать ещё')
+
+    def test_load_more_walks_all_comments(self):
+        self.client.force_login(self.author)
+        content = self.client.get(self.detail(self.post)).content.decode()
+        seen = []
+        while True:
+            more = MORE.search(content)
+            if more is None:
+                break
+            response = self.assertWithinBudget(
+                self.client, more.group(1).replace('&amp;', '&')
+            )
+            seen.extend(
+                comment.text for comment in response.context['comments']
+            )
+            content = response.content.decode()
+        self.assertEqual(seen, self.newest_first[COMMENTS_PER_PAGE:])
+
+    def test_detail_cost_does_not_grow(self):
+        counts = []
+        for post in (self.quiet, self.post):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(self.detail(post))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_fragment_errors(self):
+        url = reverse('posts:comments', args=(self.post.pk + 100,))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.get(
+            reverse('posts:comments', args=(self.post.pk,)), {'after': '!!'}
+        )
+        self.assertEqual(len(response.context['comments']), COMMENTS_PER_PAGE)
+
+    def test_fragment_within_budget(self):
+        """Ветка и пустая страница ветки укладываются в бюджет"""
+        self.client.force_login(self.author)
+        url = reverse('posts:comments', args=(self.post.pk,))
+        root = Comment.objects.filter(post=self.post).first()
+        url = f'{url}?thread={root.pk}'
+        response = self.assertWithinBudget(self.client, url)
+        page = response.context['comments_page']
+        self.assertEqual(list(page), [root])
+        response = self.assertWithinBudget(
+            self.client, url + '&after=' + page.paginator.encode_cursor(root)
+        )
+        self.assertEqual(list(response.context['comments']), [])
+
+    def test_fresh_comment_is_first(self):
+        self.client.get(self.detail(self.post))
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Самый новый'
+        )
+        response = self.client.get(self.detail(self.post))
+        self.assertEqual(response.context['comments'][0].text, 'Самый новый')
+
+
+class TestCommentThreads(TestCase):
+    """Ответы на комментарии: порядок веток, глубина и поддеревья"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.other = Post.objects.create(text='Другой', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def comment(self, text, parent=None):
+        return Comment.objects.create(
+            post=self.post, author=self.author, text=text, parent=parent
+        )
+
+    def texts(self, url, **params):
+        response = self.client.get(url, params)
+        return [comment.text for comment in response.context['comments']]
+
+    def test_threads_in_display_order(self):
+        first = self.comment('Первая ветка')
+        self.comment('Вторая ветка')
+        reply = self.comment('Ответ 1', first)
+        self.comment('Ответ на ответ', reply)
+        self.comment('Ответ 2', first)
+        detail = reverse('posts:post_detail', args=(self.post.pk,))
+        self.assertEqual(self.texts(detail), [
+            'Вторая ветка', 'Первая ветка', 'Ответ 1', 'Ответ на ответ',
+            'Ответ 2',
+        ])
+        fragment = reverse('posts:comments', args=(self.post.pk,))
+        self.assertEqual(
+            self.texts(fragment, thread=reply.pk),
+            ['Ответ 1', 'Ответ на ответ'],
+        )
+        response = self.client.get(detail)
+        self.assertContains(response, f'name="parent" value="{reply.pk}"')
+
+    def test_add_reply(self):
+        parent = self.comment('Вопрос')
+        url = reverse('posts:add_comment', args=(self.post.pk,))
+        self.client.post(url, {'text': 'Ответ', 'parent': parent.pk})
+        reply = Comment.objects.get(text='Ответ')
+        self.assertEqual((reply.parent, reply.depth), (parent, 1))
+        self.assertEqual(reply.path, parent.path + f'{reply.pk:010d}')
+
+        stranger = Comment.objects.create(
+            post=self.other, author=self.author, text='Чужой'
+        )
+        response = self.client.post(
+            url, {'text': 'Мимо', 'parent': stranger.pk}
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Comment.objects.filter(text='Мимо').exists())
+
+    def test_depth_is_bounded(self):
+        parent = None
+        for number in range(COMMENT_MAX_DEPTH + 3):
+            parent = self.comment(f'Уровень {number}', parent)
+        self.assertEqual(parent.depth, COMMENT_MAX_DEPTH)
+        self.assertLessEqual(
+            len(parent.path), Comment._meta.get_field('path').max_length
+        )
+        # Глубина ветки не добавляет запросов странице поста
+        detail = reverse('posts:post_detail', args=(self.post.pk,))
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(detail)
+        with CaptureQueriesContext(connection) as flat:
+            self.client.get(
+                reverse('posts:post_detail', args=(self.other.pk,))
+            )
+        self.assertEqual(len(deep), len(flat))
+
+    def test_imported_depth_is_bounded(self):
+        """Слишком глубокие ответы из импорта переносятся, как при
+        добавлении на сайте"""
+        comments = []
+        for number in range(COMMENT_MAX_DEPTH + 3):
+            comments.append(Comment(
+                pk=1000 + number, post=self.post, author=self.author,
+                text=f'Уровень {number}',
+                parent_id=1000 + number - 1 if number else None,
+            ))
+        Comment.objects.bulk_create(comments)
+        threads.fill_paths(Comment)
+        deepest = Comment.objects.order_by('-depth', '-pk')[:3]
+        self.assertEqual(
+            [(comment.depth, comment.parent_id) for comment in deepest],
+            [(COMMENT_MAX_DEPTH, 1000 + COMMENT_MAX_DEPTH - 1)] * 3,
+        )
@@ -0,0 +1,113 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TestConditionalGet(TestCase):
+    """Страницы отдают ETag и Last-Modified и отвечают 304 без рендера"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.user, group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:main_page'),
+            reverse('posts:group_posts_list', args=(cls.group.slug,)),
+            reverse('posts:profile', args=(cls.user.username,)),
+            reverse('posts:post_detail', args=(cls.post.pk,)),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_page_is_not_modified(self):
+        """Неизменённая страница отвечает 304"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('no-cache', response['Cache-Control'])
+                repeated = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(repeated.status_code, 304)
+                self.assertEqual(repeated.templates, [])
+                repeated = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(repeated.status_code, 304)
+
+    def test_changes_reset_validators(self):
+        """После изменения данных старый ETag не подходит"""
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        Post.objects.create(text='Ещё', author=self.user, group=self.group)
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_post_page_follows_author_post_count(self):
+        """Старый пост показывает новое число постов автора"""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        etag = self.client.get(url)['ETag']
+        newer = Post.objects.create(text='Новый', author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['count_post'], 2)
+        newer.delete()
+        self.assertEqual(self.client.get(url).context['count_post'], 1)
+
+    def test_new_post_bumps_one_author_scope(self):
+        """Новый пост сдвигает одну область автора, а не все его посты"""
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=self.user) for i in range(20)
+        )
+        with mock.patch('posts.signals.bump') as bump:
+            Post.objects.create(text='Новый', author=self.user)
+        scopes = bump.call_args[0]
+        self.assertIn(f'author:{self.user.pk}', scopes)
+        self.assertNotIn(f'post:{self.post.pk}', scopes)
+        self.assertLess(len(scopes), 10)
+
+    def test_post_page_follows_new_author(self):
+        """Пост, переданный другому автору, показывает его число постов"""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.client.get(url)
+        other = User.objects.create_user(username='other')
+        Post.objects.create(text='Свой', author=other)
+        self.post.author = other
+        self.post.save()
+        response = self.client.get(url)
+        self.assertEqual(response.context['post'].author, other)
+        self.assertEqual(response.context['count_post'], 2)
+
+    def test_follow_bumps_after_commit(self):
+        """Профили сбрасываются только после фиксации подписки"""
+        other = User.objects.create_user(username='other')
+        with mock.patch('posts.signals.bump') as bump:
+            Follow.objects.create(user=other, author=self.user)
+        # TestCase не фиксирует транзакцию, on_commit не выполняется
+        bump.assert_not_called()
+
+    def test_etag_depends_on_user(self):
+        """У разных пользователей разные ETag"""
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.counters import user_stats
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    """Тестируем денормализованные счётчики"""
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовое имя',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group_2 = Group.objects.create(
+            title='Тестовое имя2',
+            slug='test-slug2',
+            description='Тестовое описание2',
+        )
+
+    def test_post_and_comment_counters(self):
+        """Счётчики постов и комментариев следуют за созданием и удалением"""
+        post = Post.objects.create(
+            text='Тестовая запись', author=self.user, group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        self.assertEqual(user_stats(self.user.id).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        post.delete()
+        self.assertEqual(user_stats(self.user.id).posts_count, 0)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_group_change_moves_counter(self):
+        """Смена группы поста переносит счётчик"""
+        post = Post.objects.create(
+            text='Тестовая запись', author=self.user, group=self.group
+        )
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.group_2
+        post.save()
+        self.group.refresh_from_db()
+        self.group_2.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.group_2.posts_count, 1)
+
+    def test_follow_counters(self):
+        """Счётчики подписчиков и подписок"""
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(user_stats(self.user.id).followers_count, 1)
+        self.assertEqual(user_stats(self.reader.id).following_count, 1)
+        Follow.objects.all().delete()
+        self.assertEqual(user_stats(self.user.id).followers_count, 0)
+        self.assertEqual(user_stats(self.reader.id).following_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount_counters чинит рассинхронизацию"""
+        Post.objects.bulk_create(
+            Post(text='Тестовая запись', author=self.user, group=self.group)
+            for _ in range(3)
+        )
+        UserStats.objects.filter(pk=self.user.pk).update(posts_count=100)
+        call_command('recount_counters', chunk_size=1, stdout=StringIO())
+        self.assertEqual(user_stats(self.user.id).posts_count, 3)
+        self.assertEqual(user_stats(self.reader.id).posts_count, 0)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 3)
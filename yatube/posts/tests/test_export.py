@@ -0,0 +1,134 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.query_budget import QueryBudgetExceeded
+from core.testing import QueryBudgetTestMixin
+from posts import transfer, views
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class TestExport(QueryBudgetTestMixin, TestCase):
+    """Выгрузка своих данных и полная выгрузка командой"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author,
+                image='posts/ab/cd/picture.png' if number == 0 else '',
+            )
+            for number in range(5)
+        ]
+        Post.objects.create(text='Чужой пост', author=cls.other)
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text='Мой, с "кавычками"'
+        )
+        Comment.objects.create(post=cls.posts[0], author=cls.other, text='Нет')
+        Follow.objects.create(user=cls.author, author=cls.other)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def download(self, **params):
+        response = self.client.get(reverse('posts:export'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_posts_as_jsonl(self):
+        records = [
+            json.loads(line) for line in self.download().splitlines()
+        ]
+        self.assertEqual(
+            [record['text'] for record in records],
+            [post.text for post in self.posts],
+        )
+        self.assertEqual(
+            records[0]['image_url'],
+            'http://testserver/media/posts/ab/cd/picture.png',
+        )
+        self.assertEqual(records[1]['image_url'], '')
+        self.assertEqual(records[0]['author'], 'author')
+
+    def test_comments_and_follows_as_csv(self):
+        rows = list(csv.DictReader(
+            StringIO(self.download(kind='comments', format='csv'))
+        ))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['text'], 'Мой, с "кавычками"')
+        self.assertEqual(rows[0]['post'], str(self.posts[0].pk))
+        rows = list(csv.DictReader(
+            StringIO(self.download(kind='follows', format='csv'))
+        ))
+        self.assertEqual(
+            [(row['user'], row['author']) for row in rows],
+            [('author', 'other')],
+        )
+
+    def test_unknown_export_and_anonymous(self):
+        response = self.client.get(reverse('posts:export'), {'kind': 'users'})
+        self.assertEqual(response.status_code, 404)
+        response = Client().get(reverse('posts:export'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_table_is_read_in_chunks(self):
+        chunks = transfer.export_chunks('posts', chunk_size=2)
+        # три пачки и пустой запрос в конце
+        with self.assertNumQueries(4):
+            sizes = [len(records) for records in chunks]
+        self.assertEqual(sizes, [2, 2, 2])
+
+    def test_export_within_budget(self):
+        """Бюджет проверяется и у представления, и у каждого куска ответа"""
+        response = self.assertWithinBudget(
+            self.client, reverse('posts:export')
+        )
+        self.assertEqual(
+            len(b''.join(response.streaming_content).splitlines()), 5
+        )
+
+    @override_settings(QUERY_BUDGET_CHECK=True, QUERY_BUDGET_RAISE=True)
+    def test_middleware_checks_streamed_chunks(self):
+        """Middleware считает запросы, сделанные при отдаче ответа"""
+        client = Client()
+        client.force_login(self.author)
+        with mock.patch.object(views.export, 'query_budget_per_chunk', 0):
+            response = client.get(reverse('posts:export'))
+            with self.assertRaises(QueryBudgetExceeded):
+                b''.join(response.streaming_content)
+
+    def test_command_output_can_be_imported(self):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command(
+            'export_yatube', 'posts', output=path, user='author',
+            stdout=StringIO(),
+        )
+        exported = list(
+            Post.objects.filter(author=self.author)
+            .order_by('pk').values_list('text', 'pub_date', 'image')
+        )
+        Post.objects.filter(author=self.author).delete()
+        call_command(
+            'import_yatube', 'posts', path, no_rebuild=True, stdout=StringIO()
+        )
+        self.assertEqual(
+            list(
+                Post.objects.filter(author=self.author)
+                .order_by('pk').values_list('text', 'pub_date', 'image')
+            ),
+            exported,
+        )
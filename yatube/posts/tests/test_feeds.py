@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetTestMixin
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class TestFeeds(QueryBudgetTestMixin, TestCase):
+    """RSS и Atom: содержимое, кэш до нового поста и ответ 304"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Классика', slug='classic', description='Старые книги'
+        )
+        cls.post = Post.objects.create(
+            text='Все счастливые семьи <b>похожи</b>',
+            author=cls.author, group=cls.group,
+        )
+        Post.objects.create(
+            text='Пост вне группы', author=User.objects.create_user('other')
+        )
+        cls.urls = {
+            reverse('posts:feed_rss'): 2,
+            reverse('posts:feed_atom'): 2,
+            reverse('posts:group_feed_rss', args=(cls.group.slug,)): 1,
+            reverse('posts:group_feed_atom', args=(cls.group.slug,)): 1,
+            reverse('posts:profile_feed_rss', args=('author',)): 1,
+            reverse('posts:profile_feed_atom', args=('author',)): 1,
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_list_posts(self):
+        for url, count in self.urls.items():
+            with self.subTest(url=url):
+                response = self.assertWithinBudget(self.client, url)
+                self.assertIn('xml', response['Content-Type'])
+                content = response.content.decode()
+                self.assertEqual(
+                    content.count('<item>') + content.count('<entry>'), count
+                )
+                self.assertIn('Лев Толстой', content)
+                # Текст экранирован дважды: в HTML описания и в XML
+                self.assertIn('&amp;lt;b&amp;gt;похожи', content)
+                self.assertIn(
+                    reverse('posts:post_detail', args=(self.post.pk,)),
+                    content,
+                )
+
+    def test_unknown_group_and_author(self):
+        for url in (
+            reverse('posts:group_feed_rss', args=('missing',)),
+            reverse('posts:profile_feed_atom', args=('missing',)),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_feed_is_cached_until_new_post(self):
+        url = reverse('posts:group_feed_atom', args=(self.group.slug,))
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).content, response.content)
+        with self.assertNumQueries(0):
+            repeated = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(repeated.status_code, 304)
+
+        Post.objects.create(
+            text='Новая глава', author=self.author, group=self.group
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новая глава')
+
+    def test_pages_link_to_feeds(self):
+        response = self.client.get(
+            reverse('posts:group_posts_list', args=(self.group.slug,))
+        )
+        self.assertContains(
+            response,
+            reverse('posts:group_feed_atom', args=(self.group.slug,)),
+        )
+        self.assertContains(response, reverse('posts:feed_atom'))
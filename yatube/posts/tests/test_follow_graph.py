@@ -0,0 +1,172 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from core.testing import QueryBudgetTestMixin
+from posts import follow_graph
+from posts.follow_graph import FollowGraph, Replica
+from posts.models import Follow, FollowEvent, Post
+
+User = get_user_model()
+EDGES = [(1, 2), (1, 3), (2, 1), (3, 1), (5, 1)]
+
+
+class TestFollowGraph(TestCase):
+    """Ответы графа до и после слияния изменений в массивы"""
+    def test_lookups(self):
+        graph = FollowGraph(*zip(*EDGES))
+        self.assertTrue(graph.is_following(1, 3))
+        self.assertFalse(graph.is_following(3, 2))
+        self.assertFalse(graph.is_following(99, 1))
+        self.assertEqual(graph.following_many(1, [2, 3, 4, 99]), {2, 3})
+        self.assertEqual(graph.following_many(4, [1, 2]), set())
+        self.assertEqual(graph.followers_count(1), 3)
+        self.assertEqual(graph.following_count(1), 2)
+        self.assertEqual(graph.followers.row(1), [2, 3, 5])
+
+    def test_changes_and_compaction(self):
+        graph = FollowGraph(*zip(*EDGES))
+        graph.add(4, 2)
+        graph.add(1, 2)
+        graph.remove(1, 3)
+        graph.remove(4, 5)
+        self.assertEqual(graph.pending, 2)
+        self.assertEqual(graph.following_many(1, [2, 3]), {2})
+        self.assertEqual(graph.following_many(4, [2, 3]), {2})
+        compacted = graph.compacted()
+        self.assertEqual(compacted.pending, 0)
+        for current in (graph, compacted):
+            self.assertTrue(current.is_following(4, 2))
+            self.assertFalse(current.is_following(1, 3))
+            self.assertEqual(current.followers_count(2), 2)
+            self.assertEqual(current.followers_count(3), 0)
+            self.assertEqual(current.following_count(1), 1)
+        self.assertEqual(
+            list(compacted.following.edges()),
+            [(1, 2), (2, 1), (3, 1), (4, 2), (5, 1)],
+        )
+
+
+class TestReplica(QueryBudgetTestMixin, TestCase):
+    """Граф процесса догоняет журнал подписок"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.replica = Replica()
+        self.replica.current()
+
+    def test_follows_are_seen(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        with self.assertNumQueries(1):
+            graph = self.replica.current()
+        self.assertTrue(graph.is_following(self.reader.id, self.author.id))
+        self.assertEqual(graph.followers_count(self.author.id), 1)
+        with self.assertNumQueries(0):
+            self.replica.current()
+        follow.delete()
+        graph = self.replica.current()
+        self.assertFalse(graph.is_following(self.reader.id, self.author.id))
+
+    def test_reload_after_bulk_create(self):
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.author)]
+        )
+        graph = self.replica.current()
+        self.assertFalse(graph.is_following(self.reader.id, self.author.id))
+        follow_graph.reload()
+        graph = self.replica.current()
+        self.assertTrue(graph.is_following(self.reader.id, self.author.id))
+
+    def test_lost_journal_reloads(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.replica.current()
+        FollowEvent.objects.all().delete()
+        Follow.objects.create(user=self.author, author=self.reader)
+        graph = self.replica.current()
+        self.assertTrue(graph.is_following(self.author.id, self.reader.id))
+        self.assertTrue(graph.is_following(self.reader.id, self.author.id))
+
+    def test_compaction(self):
+        users = [User.objects.create_user(f'user{n}') for n in range(3)]
+        with mock.patch.object(follow_graph, 'FOLLOW_GRAPH_COMPACT', 2):
+            for user in users:
+                Follow.objects.create(user=user, author=self.author)
+            graph = self.replica.current()
+        self.assertEqual(graph.pending, 0)
+        self.assertEqual(graph.followers_count(self.author.id), 3)
+
+    def test_pruned_journal_reloads(self):
+        users = [User.objects.create_user(f'user{n}') for n in range(4)]
+        Follow.objects.create(user=self.reader, author=self.author)
+        behind = Replica()
+        behind.current()
+        with mock.patch.object(follow_graph, 'FOLLOW_GRAPH_JOURNAL', 1), \
+                mock.patch.object(follow_graph, 'PRUNE_EVERY', 1):
+            for user in users:
+                Follow.objects.create(user=user, author=self.author)
+        self.assertEqual(FollowEvent.objects.count(), 2)
+        for replica in (self.replica, behind):
+            self.assertEqual(replica.current().followers_count(
+                self.author.id
+            ), 5)
+
+    def test_profile_queries(self):
+        """Профиль для вошедшего: граф без запросов, пока он не отстал, и
+        в бюджете, когда его нужно догнать или перечитать"""
+        Post.objects.create(text='Пост', author=self.author)
+        self.client.force_login(self.reader)
+        url = reverse('posts:profile', args=(self.author.username,))
+        with mock.patch.object(follow_graph, 'replica', self.replica):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            self.assertFalse([
+                query for query in queries
+                if 'posts_follow' in query['sql']
+            ])
+            Follow.objects.create(user=self.author, author=self.reader)
+            response = self.assertWithinBudget(self.client, url + '?page=1')
+            self.assertTrue(response.context['follows_you'])
+            follow_graph.reload()
+            self.assertWithinBudget(self.client, url + '?page=2')
+
+    def test_profile_queries_with_image(self):
+        """Картинки добавляют запрос к KVStore, бюджет это учитывает"""
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        buffer = BytesIO()
+        Image.new('RGB', (40, 20)).save(buffer, 'png')
+        image = SimpleUploadedFile('picture.png', buffer.getvalue())
+        self.client.force_login(self.reader)
+        url = reverse('posts:profile', args=(self.author.username,))
+        with override_settings(MEDIA_ROOT=media_root), mock.patch.object(
+            follow_graph, 'replica', self.replica
+        ):
+            Post.objects.create(text='Пост', author=self.author, image=image)
+            Follow.objects.create(user=self.author, author=self.reader)
+            follow_graph.reload()
+            self.assertWithinBudget(self.client, url)
+
+    def test_profile_uses_graph(self):
+        Follow.objects.create(user=self.author, author=self.reader)
+        self.client.force_login(self.reader)
+        response = self.client.get(
+            reverse('posts:profile', args=(self.author.username,))
+        )
+        self.assertTrue(response.context['follows_you'])
+        self.assertFalse(response.context['following'])
+        self.assertContains(response, 'Подписан на вас')
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -7,6 +8,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from core.storage import shard
 from posts.models import Group, Post, Comment
 
 
@@ -83,7 +85,9 @@ class TestCreateForm(TestCase):
             Post.objects.filter(
                 group=TestCreateForm.group.id,
                 text=TestCreateForm.post.text,
-                image='posts/small.gif',
+                image=shard(
+                    'posts', hashlib.sha256(small_gif).hexdigest(), '.gif'
+                ),
             ).exists()
         )
 
@@ -0,0 +1,181 @@
+import json
+import os
+import tempfile
+from datetime import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, Timeline, UserStats
+from posts.search import search_posts
+
+User = get_user_model()
+
+
+def write_file(test, suffix, content):
+    handle, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(handle, 'w', encoding='utf-8') as data_file:
+        data_file.write(content)
+    test.addCleanup(os.remove, path)
+    return path
+
+
+def jsonl(records):
+    return ''.join(
+        json.dumps(record, ensure_ascii=False) + '\n' for record in records
+    )
+
+
+def import_data(kind, path, **options):
+    output = StringIO()
+    call_command('import_yatube', kind, path, stdout=output, **options)
+    return output.getvalue()
+
+
+class TestImport(TestCase):
+    """Загрузка постов, комментариев и подписок из файлов"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def test_posts_from_jsonl(self):
+        path = write_file(self, '.jsonl', jsonl([
+            {
+                'id': 500, 'author': 'author', 'group': 'group',
+                'text': 'Старый пост про котиков',
+                'pub_date': '2001-06-01T12:00:00',
+            },
+            {'author': 'author', 'text': 'Без даты'},
+            {'author': 'author', 'group': 'nowhere', 'text': 'Чужая группа'},
+            {'author': 'stranger', 'text': 'Неизвестный автор'},
+        ]))
+        output = import_data('posts', path, chunk_size=1)
+        self.assertIn('строк/с', output)
+        self.assertIn('Пропущено строк: 2', output)
+
+        old = Post.objects.get(pk=500)
+        self.assertEqual(
+            old.pub_date, timezone.make_aware(datetime(2001, 6, 1, 12))
+        )
+        self.assertEqual(old.group, self.group)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(list(search_posts('котиков')), [old])
+        self.assertEqual(
+            UserStats.objects.get(pk=self.author.pk).posts_count, 2
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertGreater(
+            Post.objects.create(text='Новый', author=self.author).pk, 500
+        )
+
+    def test_comments_and_follows_from_csv(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        path = write_file(
+            self, '.csv',
+            'post,author,text,pub_date\n'
+            f'{post.pk},reader,Отличный пост,2020-01-01T00:00:00+00:00\n'
+            f'{post.pk + 1},reader,К несуществующему,\n',
+        )
+        import_data('comments', path)
+        comment = Comment.objects.get()
+        self.assertEqual(comment.author, self.reader)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        path = write_file(self, '.csv', (
+            'user,author\n'
+            'reader,author\n'
+            'reader,author\n'
+            'author,author\n'
+        ))
+        import_data('follows', path)
+        self.assertEqual(
+            list(Follow.objects.values_list('user', 'author')),
+            [(self.reader.pk, self.author.pk)],
+        )
+        self.assertTrue(
+            Timeline.objects.filter(user=self.reader, post=post).exists()
+        )
+
+    def test_comment_threads(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        path = write_file(self, '.jsonl', jsonl([
+            {'id': 10, 'post': post.pk, 'author': 'reader', 'text': 'Корень'},
+            {
+                'id': 11, 'post': post.pk, 'parent': 10, 'author': 'author',
+                'text': 'Ответ',
+            },
+            {
+                'id': 12, 'post': post.pk, 'parent': 11, 'author': 'reader',
+                'text': 'Ответ на ответ',
+            },
+            {
+                'post': post.pk, 'parent': 999, 'author': 'reader',
+                'text': 'Ответ в пустоту',
+            },
+        ]))
+        import_data('comments', path, chunk_size=2)
+        self.assertEqual(
+            list(
+                Comment.objects.order_by('path').values_list('text', 'depth')
+            ),
+            [('Корень', 0), ('Ответ', 1), ('Ответ на ответ', 2)],
+        )
+        reply = Comment.objects.create(
+            post=post, author=self.author, text='Новый', parent_id=12
+        )
+        self.assertEqual(reply.depth, 3)
+
+    def test_duplicate_id_is_reported(self):
+        """Занятый id называется в ошибке, а не падает IntegrityError"""
+        post = Post.objects.create(text='Уже есть', author=self.author)
+        path = write_file(self, '.csv', (
+            'id,author,text\n'
+            f'{post.pk + 1},author,Новый\n'
+            f'{post.pk},author,Повтор\n'
+        ))
+        with self.assertRaisesMessage(
+            CommandError, f'запись с id {post.pk} уже есть'
+        ):
+            import_data('posts', path)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_unknown_authors_are_created(self):
+        path = write_file(self, '.jsonl', jsonl([
+            {'author': 'newcomer', 'text': 'Привет'},
+        ]))
+        import_data('posts', path, create_users=True)
+        newcomer = User.objects.get(username='newcomer')
+        self.assertFalse(newcomer.has_usable_password())
+        self.assertEqual(Post.objects.get().author, newcomer)
+
+
+class TestDeferredIndexes(TransactionTestCase):
+    """Индексы снимаются на время загрузки и возвращаются после"""
+    def index_names(self):
+        with connection.cursor() as cursor:
+            return set(connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            ))
+
+    def test_indexes_are_rebuilt(self):
+        User.objects.create_user(username='author')
+        before = self.index_names()
+        path = write_file(self, '.jsonl', jsonl(
+            {'author': 'author', 'text': f'Пост {number}'}
+            for number in range(5)
+        ))
+        import_data('posts', path, defer_indexes=True, chunk_size=2)
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(self.index_names(), before)
+        self.assertEqual(len(search_posts('пост')), 5)
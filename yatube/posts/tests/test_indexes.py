@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.utils.paginator import CursorPaginator
+
+User = get_user_model()
+
+
+def query_plan(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def bad_steps(plan):
+    """Шаги плана с полным проходом по таблице или сортировкой в памяти
+
+    Проход по подзапросу (COUNT поверх аннотаций) не считается: таблицы
+    внутри него проверяются собственными шагами плана.
+    """
+    return [
+        step for step in plan
+        if 'TEMP B-TREE' in step
+        or (
+            step.startswith('SCAN')
+            and 'INDEX' not in step
+            and 'subquery' not in step
+        )
+    ]
+
+
+class QueryPlanTest(TestCase):
+    """Запросы лент и страницы поста должны идти по индексам"""
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.author = User.objects.create_user(username='author')
+        cls.client_user = Client()
+        cls.client_user.force_login(cls.user)
+        cls.group = Group.objects.create(
+            title='Тестовое имя',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for number in range(15):
+            post = Post.objects.create(
+                text=f'Тестовая запись {number}',
+                author=cls.author,
+                group=cls.group,
+            )
+            Comment.objects.create(post=post, author=cls.user, text='Текст')
+        cls.post = post
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def assert_indexed(self, url):
+        with CaptureQueriesContext(connection) as context:
+            self.client_user.get(url)
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            with self.subTest(url=url, sql=sql):
+                # Параметры уже подставлены в sql, план от этого не меняется
+                plan = query_plan(sql, ())
+                self.assertEqual(bad_steps(plan), [], plan)
+
+    def test_feeds_use_indexes(self):
+        """Ленты не сканируют таблицы и не сортируют во временном B-дереве"""
+        after = CursorPaginator(
+            Post.objects.all(), 10
+        ).get_page().next_cursor
+        urls = (
+            reverse('posts:main_page'),
+            reverse('posts:group_posts_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            self.assert_indexed(url)
+            self.assert_indexed(url + '?page=2')
+        self.assert_indexed(reverse('posts:main_page') + f'?after={after}')
+        response = self.client_user.get(
+            reverse('posts:follow_index') + '?after=first'
+        )
+        follow_after = response.context['page_obj'].next_cursor
+        self.assertIsNotNone(follow_after)
+        self.assert_indexed(
+            reverse('posts:follow_index') + f'?after={follow_after}'
+        )
+        self.assert_indexed(
+            reverse('posts:follow_index') + f'?before={follow_after}'
+        )
+
+    def test_post_detail_uses_indexes(self):
+        """Страница поста и его комментарии читаются по индексам"""
+        self.assert_indexed(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import QueryBudgetMiddleware
+from core.query_budget import QueryRecorder, get_budget
+from core.testing import QueryBudgetTestMixin
+from posts import urls
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class QueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    """Представления укладываются в бюджет запросов и не делают N+1"""
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.authorized = Client()
+        cls.authorized.force_login(cls.user)
+        cls.group = Group.objects.create(
+            title='Тестовое имя',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for number in range(12):
+            author = User.objects.create_user(username=f'author{number}')
+            Follow.objects.create(user=cls.user, author=author)
+            post = Post.objects.create(
+                text='Тестовая запись', author=author, group=cls.group
+            )
+            Comment.objects.create(post=post, author=author, text='Текст')
+        cls.post = post
+        cls.author = author
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_recorder_detects_n_plus_one(self):
+        """Одинаковые запросы в цикле распознаются как N+1"""
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for post in Post.objects.all():
+                post.author.username
+        self.assertEqual(len(recorder.repeated()), 1)
+        self.assertEqual(len(recorder.problems(budget=13)), 1)
+
+    def test_every_view_declares_budget(self):
+        """У каждого представления posts есть бюджет запросов"""
+        for pattern in urls.urlpatterns:
+            with self.subTest(name=pattern.name):
+                self.assertIsNotNone(get_budget(pattern.callback))
+
+    def test_views_within_budget(self):
+        """Запросы к страницам укладываются в бюджет"""
+        addresses = (
+            reverse('posts:main_page'),
+            reverse('posts:group_posts_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author0'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+            reverse('posts:profile_unfollow', kwargs={'username': 'author1'}),
+            reverse('posts:profile_follow', kwargs={'username': 'author1'}),
+        )
+        for address in addresses:
+            for client in (Client(), self.authorized):
+                with self.subTest(address=address):
+                    self.assertWithinBudget(client, address)
+
+    def test_add_comment_within_budget(self):
+        """Добавление комментария укладывается в бюджет"""
+        self.assertWithinBudget(
+            self.authorized,
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            method='post',
+            data={'text': 'Новый комментарий'},
+        )
+
+    def test_writes_within_budget(self):
+        """Создание и правка поста с группой укладываются в бюджет"""
+        other = Group.objects.create(title='Другая', slug='other')
+        self.assertWithinBudget(
+            self.authorized, reverse('posts:post_create'), method='post',
+            data={'text': 'Новый пост', 'group': self.group.pk},
+        )
+        post = Post.objects.filter(author=self.user).first()
+        self.assertWithinBudget(
+            self.authorized,
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            method='post', data={'text': 'Правка', 'group': other.pk},
+        )
+
+    @override_settings(QUERY_BUDGET_CHECK=False)
+    def test_middleware_can_be_disabled(self):
+        """При QUERY_BUDGET_CHECK = False middleware не подключается"""
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryBudgetMiddleware(lambda request: None)
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetTestMixin
+from posts.models import Post
+from posts.search import search_posts
+
+User = get_user_model()
+
+
+class TestSearch(QueryBudgetTestMixin, TestCase):
+    """Полнотекстовый поиск FTS5: индекс, выдача и админка"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='admin', is_staff=True, is_superuser=True
+        )
+        cls.cats = Post.objects.create(
+            text='Котики спят весь день, котики едят', author=cls.user
+        )
+        cls.dogs = Post.objects.create(
+            text='Собаки гуляют, а один котик смотрит', author=cls.user
+        )
+        cls.html = Post.objects.create(
+            text='<script>котики</script>', author=cls.user
+        )
+
+    def test_index_follows_table(self):
+        """Индекс поиска следует за таблицей постов"""
+        self.assertEqual(list(search_posts('гуляют')), [self.dogs])
+        Post.objects.filter(pk=self.dogs.pk).update(text='Собаки спят')
+        self.assertEqual(list(search_posts('гуляют')), [])
+        self.assertEqual(list(search_posts('собаки')), [self.dogs])
+        Post.objects.get(pk=self.dogs.pk).delete()
+        self.assertEqual(list(search_posts('собаки')), [])
+
+    def test_ranking_and_prefix(self):
+        """Поиск по префиксу, лучшие совпадения первыми"""
+        results = list(search_posts('котик'))
+        self.assertEqual(results[0], self.cats)
+        self.assertCountEqual(results, [self.cats, self.dogs, self.html])
+        self.assertEqual(list(search_posts('"!')), [])
+
+    def test_search_page(self):
+        """Страница поиска укладывается в бюджет запросов"""
+        client = Client()
+        client.force_login(self.user)
+        response = self.assertWithinBudget(
+            client, reverse('posts:search') + '?q=спят'
+        )
+        self.assertContains(response, '<mark>спят</mark>')
+        response = self.client.get(reverse('posts:search'), {'q': 'script'})
+        self.assertContains(response, '&lt;<mark>script</mark>&gt;')
+        self.assertNotContains(response, '<script>котики')
+
+    def test_search_page_keeps_query_in_pagination(self):
+        """Ссылки пагинатора сохраняют запрос"""
+        Post.objects.bulk_create(
+            Post(text=f'Пост про сыр {number}', author=self.user)
+            for number in range(12)
+        )
+        response = self.client.get(reverse('posts:search'), {'q': 'сыр'})
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(response, '?q=%D1%81%D1%8B%D1%80&amp;page=2')
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по индексу"""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'гуляют'}
+        )
+        self.assertEqual(list(response.context['cl'].result_list), [self.dogs])
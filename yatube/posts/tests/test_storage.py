@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.storage import file_digest, shard
+from posts import thumbnails
+from posts.models import Post, ThumbnailTask
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(color, name='picture.png'):
+    buffer = BytesIO()
+    Image.new('RGB', (30, 20), color).save(buffer, 'png')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TestContentAddressedStorage(TestCase):
+    """Одинаковые картинки хранятся одним файлом, лишние собирает GC"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='collector')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create(self, image):
+        return Post.objects.create(text='Пост', author=self.user, image=image)
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые загрузки хранятся одним файлом"""
+        first = self.create(image_file('red', 'first.png'))
+        second = self.create(image_file('red', 'second.PNG'))
+        other = self.create(image_file('blue'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertRegex(
+            first.image.name, r'^posts/(\w\w)/(\w\w)/\1\2\w{60}\.png$'
+        )
+
+        client = Client()
+        client.force_login(self.user)
+        client.post(
+            reverse('posts:post_edit', args=(first.pk,)),
+            {'text': 'Пост', 'image': image_file('red', 'again.png')},
+        )
+        first.refresh_from_db()
+        self.assertEqual(first.image.name, second.image.name)
+
+    def test_collect_media_removes_unreferenced(self):
+        """collect_media удаляет только файлы без ссылок"""
+        kept = self.create(image_file('red'))
+        shared = self.create(image_file('green'))
+        self.create(image_file('green'))
+        thumbnails.process_queue()
+        orphan = self.create(image_file('blue'))
+        name = orphan.image.name
+        thumbnail = thumbnails.thumbnail_file(
+            orphan.image, next(thumbnails.variants('card'))
+        )
+        thumbnails.generate(orphan.image)
+        self.assertTrue(thumbnail.exists())
+        orphan.delete()
+        shared.delete()
+        storage = kept.image.storage
+
+        call_command('collect_media', stdout=StringIO())
+        self.assertTrue(storage.exists(name), 'файл моложе --grace удалён')
+
+        call_command('collect_media', grace=0, stdout=StringIO())
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(thumbnail.exists())
+        self.assertTrue(storage.exists(kept.image.name))
+        self.assertTrue(storage.exists(shared.image.name))
+
+    def test_reupload_refreshes_grace(self):
+        """Повторная загрузка старого файла продлевает ему --grace"""
+        post = self.create(image_file('blue'))
+        name = post.image.name
+        storage = post.image.storage
+        post.delete()
+        os.utime(storage.path(name), (0, 0))
+        self.assertEqual(
+            storage.save('posts/again.png', image_file('blue')), name
+        )
+
+        call_command('collect_media', stdout=StringIO())
+        self.assertTrue(storage.exists(name))
+
+    def test_shard_media_moves_flat_files(self):
+        """shard_media раскладывает старые файлы по каталогам"""
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        content = image_file('yellow')
+        path = os.path.join(TEMP_MEDIA_ROOT, 'posts', 'flat.png')
+        with open(path, 'wb') as flat_file:
+            flat_file.write(content.read())
+        flat = [
+            self.create('posts/flat.png'),
+            self.create('posts/flat.png'),
+        ]
+        sharded = self.create(image_file('red'))
+        storage = sharded.image.storage
+        ThumbnailTask.objects.all().delete()
+
+        call_command('shard_media', chunk_size=1, stdout=StringIO())
+        expected = shard('posts', file_digest(content), '.png')
+        for post in flat:
+            version = post.version
+            post.refresh_from_db()
+            self.assertEqual(post.image.name, expected)
+            self.assertEqual(post.version, version + 1)
+        self.assertTrue(storage.exists(expected))
+        self.assertFalse(storage.exists('posts/flat.png'))
+        self.assertEqual(ThumbnailTask.objects.count(), 2)
+
+        output = StringIO()
+        call_command('shard_media', stdout=output)
+        self.assertNotIn('Перенесено', output.getvalue())
@@ -0,0 +1,193 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from posts import thumbnails
+from posts.models import Post, ThumbnailTask
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(name='picture.png', color=(200, 0, 0)):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 20), color).save(buffer, 'png')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TestThumbnailQueue(TestCase):
+    """Миниатюры создаёт воркер, шаблоны до этого показывают оригинал"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='painter')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_upload_enqueues_task(self):
+        """Задачу ставит только новая картинка"""
+        self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'С картинкой', 'image': image_file()},
+        )
+        post = Post.objects.get()
+        self.assertTrue(ThumbnailTask.objects.filter(post=post).exists())
+
+        ThumbnailTask.objects.all().delete()
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'Новый текст'},
+        )
+        self.assertFalse(ThumbnailTask.objects.exists())
+
+        Post.objects.create(text='Без картинки', author=self.user)
+        self.assertFalse(ThumbnailTask.objects.exists())
+
+    def test_thumbnail_file_matches_sorl(self):
+        """Имя файла миниатюры совпадает с именем от sorl"""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=image_file()
+        )
+        for name in thumbnails.THUMBNAILS:
+            for variant in thumbnails.variants(name):
+                with self.subTest(name=name, variant=variant):
+                    self.assertEqual(
+                        thumbnails.thumbnail_file(post.image, variant).name,
+                        get_thumbnail(
+                            post.image, variant.geometry, **variant.options
+                        ).name,
+                    )
+
+    def test_worker_replaces_original(self):
+        """После воркера страницы показывают миниатюры вместо оригинала"""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=image_file()
+        )
+        response = self.client.get(reverse('posts:main_page'))
+        self.assertContains(response, post.image.url)
+
+        self.assertEqual(thumbnails.process_queue(), 1)
+        self.assertFalse(ThumbnailTask.objects.exists())
+        card, *card_variants = [
+            thumbnails.thumbnail_file(post.image, variant)
+            for variant in thumbnails.variants('card')
+        ]
+        detail = thumbnails.thumbnail_file(
+            post.image, next(thumbnails.variants('detail'))
+        )
+        self.assertTrue(card.exists())
+
+        response = self.client.get(reverse('posts:main_page'))
+        self.assertContains(response, card.url)
+        self.assertNotContains(response, post.image.url)
+        for variant in card_variants:
+            self.assertContains(response, variant.url)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(response, detail.url)
+
+    def test_failed_task_is_retried(self):
+        """Упавшая задача остаётся в очереди и берётся после паузы"""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=image_file()
+        )
+        with mock.patch.object(
+            thumbnails, 'generate', side_effect=OSError
+        ), self.assertLogs(thumbnails.logger):
+            self.assertEqual(thumbnails.process_queue(), 1)
+        task = ThumbnailTask.objects.get(post=post)
+        self.assertEqual(task.attempts, 1)
+        self.assertEqual(thumbnails.process_queue(), 0)
+
+        ThumbnailTask.objects.update(available=task.created)
+        self.assertEqual(thumbnails.process_queue(), 1)
+        self.assertFalse(ThumbnailTask.objects.exists())
+
+    def test_new_image_restarts_exhausted_task(self):
+        """Новая картинка заново ставит задачу, исчерпавшую попытки"""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=image_file()
+        )
+        ThumbnailTask.objects.update(
+            attempts=settings.THUMBNAIL_TASK_ATTEMPTS
+        )
+        self.assertEqual(thumbnails.process_queue(), 0)
+
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'Пост', 'image': image_file(color=(0, 0, 200))},
+        )
+        task = ThumbnailTask.objects.get(post=post)
+        self.assertEqual(task.attempts, 0)
+        self.assertEqual(thumbnails.process_queue(), 1)
+        self.assertFalse(ThumbnailTask.objects.exists())
+
+    def test_page_lookup_is_batched(self):
+        """Миниатюры всей страницы ищутся одним запросом"""
+        posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=self.user, image=image_file()
+            )
+            for number in range(3)
+        ]
+        Post.objects.create(text='Без картинки', author=self.user)
+        thumbnails.process_queue()
+        posts = list(Post.objects.order_by('pk'))
+        cache.clear()
+        with self.assertNumQueries(1):
+            thumbnails.attach_thumbnails(posts, 'card')
+        with self.assertNumQueries(0):
+            thumbnails.attach_thumbnails(posts, 'card')
+        card = next(thumbnails.variants('card'))
+        for post in posts[:3]:
+            self.assertEqual(
+                post.thumbnail_url,
+                thumbnails.thumbnail_file(post.image, card).url,
+            )
+            self.assertEqual(
+                [mime for mime, srcset in post.thumbnail_sources],
+                [
+                    thumbnails.MODERN_FORMATS[image_format][0]
+                    for image_format in thumbnails.FORMATS
+                ],
+            )
+        self.assertEqual(posts[3].thumbnail_url, '')
+
+    def test_modern_variants_are_smaller(self):
+        """AVIF и WebP легче запасной миниатюры"""
+        buffer = BytesIO()
+        Image.effect_noise((1200, 800), 64).convert('RGB').save(
+            buffer, 'jpeg', quality=95
+        )
+        post = Post.objects.create(
+            text='Шум', author=self.user,
+            image=SimpleUploadedFile('noise.jpg', buffer.getvalue()),
+        )
+        thumbnails.generate(post.image)
+        fallback, *modern = [
+            default_storage.size(
+                thumbnails.thumbnail_file(post.image, variant).name
+            )
+            for variant in thumbnails.variants('card')
+        ]
+        self.assertLess(min(modern), fallback)
@@ -0,0 +1,128 @@
+import multiprocessing
+import resource
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.images import downscale
+from posts.models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(size, image_format='jpeg', name='picture.jpg'):
+    buffer = BytesIO()
+    Image.new('RGB', size, (0, 120, 200)).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/' + image_format)
+
+
+def peak_memory(action, path, result):
+    """Прирост пикового RSS процесса, пока выполнялось action(path)"""
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(path, 'rb') as upload:
+        action(upload)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result.put((after - before) * 1024)
+
+
+def full_decode(upload):
+    Image.open(upload).load()
+
+
+def bounded_downscale(upload):
+    downscale(UploadedFile(upload, 'huge.jpg', 'image/jpeg'), 1280)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TestImageUpload(TestCase):
+    """Загрузка картинок: проверка по заголовку и уменьшение оригиналов"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='uploader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create(self, image):
+        return self.client.post(
+            reverse('posts:post_create'), {'text': 'Пост', 'image': image}
+        )
+
+    @override_settings(UPLOAD_MAX_SIZE=1024)
+    def test_oversized_file_is_rejected(self):
+        """Слишком большой файл не принимается"""
+        response = self.create(image_file((800, 800), 'png', 'big.png'))
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 1,0\xa0КБ'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_too_many_pixels_are_rejected(self):
+        """Картинка со слишком большим числом пикселей не принимается"""
+        with mock.patch('posts.forms.IMAGE_MAX_PIXELS', 100):
+            response = self.create(image_file((20, 20)))
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка 20x20 слишком большая'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_decoded_formats_have_lower_limit(self):
+        """PNG без уменьшения при декодировании ограничен сильнее JPEG"""
+        with mock.patch('posts.forms.IMAGE_MAX_DECODED_PIXELS', 100):
+            response = self.create(image_file((20, 20), 'png', 'big.png'))
+            self.assertFormError(
+                response, 'form', 'image', 'Картинка 20x20 слишком большая'
+            )
+            self.assertFalse(Post.objects.exists())
+            self.create(image_file((20, 20)))
+        self.assertTrue(Post.objects.exists())
+
+    def test_unsupported_format_is_rejected(self):
+        """Неподдерживаемый формат не принимается"""
+        response = self.create(image_file((20, 20), 'bmp', 'picture.bmp'))
+        self.assertFormError(
+            response, 'form', 'image', 'Формат BMP не поддерживается'
+        )
+
+    def test_huge_original_is_downscaled(self):
+        """Большой оригинал уменьшается по длинной стороне"""
+        with mock.patch('posts.forms.IMAGE_MAX_DIMENSION', 100):
+            self.create(image_file((400, 200)))
+        post = Post.objects.get()
+        self.assertEqual(
+            (post.image.width, post.image.height), (100, 50)
+        )
+
+    def test_downscale_memory_is_bounded(self):
+        """Уменьшение огромной картинки не раскрывает её целиком в памяти"""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as huge:
+            Image.new('RGB', (6000, 4000), (0, 120, 200)).save(huge, 'jpeg')
+            huge.flush()
+            context = multiprocessing.get_context('fork')
+            peaks = {}
+            for action in (full_decode, bounded_downscale):
+                result = context.Queue()
+                process = context.Process(
+                    target=peak_memory, args=(action, huge.name, result)
+                )
+                process.start()
+                peaks[action] = result.get(timeout=60)
+                process.join()
+        # Полный растр 6000x4000 весит около 96 МБ
+        self.assertGreater(peaks[full_decode], 64 * 1024 * 1024)
+        self.assertLess(peaks[bounded_downscale], 24 * 1024 * 1024)
@@ -1,13 +1,20 @@
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
 from django import forms
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase
 from django.urls import reverse
 from django.conf import settings
+from django.core.paginator import Paginator
 from django.core.cache import cache
+from django.core.management import call_command
 
-from posts.models import Group, Post, Follow
+from posts.models import Follow, Group, Post, Timeline
+from posts.utils.paginator import (
+    CachedCountPaginator, CountlessPaginator, CursorPaginator, page_window
+)
 
 User = get_user_model()
 
@@ -158,16 +165,30 @@ class PostViewsTest(TestCase):
                 self.assertEqual(post_group, PostViewsTest.post.group)
 
     def test_cache_in_main_page(self):
+        """Главная страница берётся из кэша, пока посты не изменились"""
         response = self.authorized.get(reverse('posts:main_page'))
         page_content = response.content
+        # update() не шлёт сигналов, поэтому кэш страницы не сбрасывается
+        Post.objects.update(text='Изменено в обход сигналов')
+        response_cached = self.authorized.get(reverse('posts:main_page'))
+        self.assertEqual(page_content, response_cached.content)
         Post.objects.all().delete()
         response_after_delete = self.authorized.get(reverse('posts:main_page'))
-        page_content_after_delete = response_after_delete.content
-        cache.clear()
-        response_cache_clear = self.authorized.get(reverse('posts:main_page'))
-        page_content_cache_clear = response_cache_clear.content
-        self.assertEqual(page_content, page_content_after_delete)
-        self.assertNotEqual(page_content, page_content_cache_clear)
+        self.assertNotEqual(page_content, response_after_delete.content)
+        self.assertEqual(len(response_after_delete.context['page_obj']), 0)
+
+    def test_cache_of_post_page_reset_by_comment(self):
+        """Новый комментарий сразу виден на закэшированной странице поста"""
+        address = reverse(
+            'posts:post_detail', kwargs={'post_id': PostViewsTest.post.id}
+        )
+        self.authorized.get(address)
+        self.authorized.post(
+            reverse('posts:add_comment',
+                    kwargs={'post_id': PostViewsTest.post.id}),
+            data={'text': 'Свежий комментарий'},
+        )
+        self.assertContains(self.authorized.get(address), 'Свежий комментарий')
 
     def test_in_post_another_group(self):
         """Тест что пост не попал в другую группу"""
@@ -202,6 +223,9 @@ class TestPaginator(TestCase):
         ]
         Post.objects.bulk_create(objs)
 
+    def setUp(self) -> None:
+        cache.clear()
+
     def test_paginator_pages(self):
         """Тест пагинатора первых страниц профиля, групп и главной"""
         address_names = (
@@ -225,6 +249,69 @@ class TestPaginator(TestCase):
                         number_of_posts
                     )
 
+    def test_cursor_paginator_pages(self):
+        """Тест курсорной пагинации вперёд и назад"""
+        first_page = CursorPaginator(
+            Post.objects.all(), settings.POSTS_PER_PAGE
+        ).get_page()
+        self.assertTrue(first_page.has_next())
+        self.assertFalse(first_page.has_previous())
+        response = self.authorized.get(
+            reverse('posts:main_page') + f'?after={first_page.next_cursor}'
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 3)
+        self.assertFalse(page_obj.has_next())
+        self.assertTrue(page_obj.has_previous())
+        self.assertNotIn(page_obj[0], first_page.object_list)
+        response = self.authorized.get(
+            reverse('posts:main_page') + f'?before={page_obj.previous_cursor}'
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), first_page.object_list
+        )
+
+    def test_countless_paginator_pages(self):
+        """Пагинатор без COUNT(*) определяет следующую страницу сам"""
+        paginator = CountlessPaginator(
+            Post.objects.all(), settings.POSTS_PER_PAGE
+        )
+        with self.assertNumQueries(1):
+            first_page = paginator.get_page(1)
+            self.assertTrue(first_page.has_next())
+        last_page = paginator.get_page(2)
+        self.assertEqual(len(last_page), 3)
+        self.assertFalse(last_page.has_next())
+        self.assertEqual(paginator.get_page(100).number, 1)
+
+    def test_cached_count_paginator(self):
+        """Число постов берётся из кэша, а не из базы"""
+        CachedCountPaginator(Post.objects.all(), 10).count
+        with self.assertNumQueries(0):
+            count = CachedCountPaginator(Post.objects.all(), 10).count
+        self.assertEqual(count, settings.POSTS_PER_PAGE + 3)
+
+    def test_page_window(self):
+        """Список страниц обрезается вокруг текущей"""
+        paginator = Paginator(range(1000), 10)
+        self.assertEqual(
+            page_window(paginator.page(50)),
+            [1, None, 48, 49, 50, 51, 52, None, 100],
+        )
+        self.assertEqual(page_window(paginator.page(1)), [1, 2, 3, None, 100])
+        self.assertEqual(
+            page_window(Paginator(range(30), 10).page(2)), [1, 2, 3]
+        )
+
+    def test_cursor_paginator_broken_cursor(self):
+        """Испорченный курсор открывает первую страницу"""
+        response = self.authorized.get(
+            reverse('posts:main_page') + '?after=broken'
+        )
+        self.assertEqual(
+            len(response.context['page_obj']), settings.POSTS_PER_PAGE
+        )
+
 
 class TestSubscribers(TestCase):
     """Тестируем возможности подписчика"""
@@ -301,3 +388,67 @@ class TestSubscribers(TestCase):
             new_post,
             response.context['page_obj']
         )
+
+    def test_timeline_follows_subscriptions(self):
+        """Лента подписок заполняется при публикации и подписке"""
+        Follow.objects.create(
+            user=TestSubscribers.user2,
+            author=TestSubscribers.user,
+        )
+        new_post = Post.objects.create(
+            text='Тестовая запись',
+            author=TestSubscribers.user,
+        )
+        self.assertTrue(
+            Timeline.objects.filter(
+                user=TestSubscribers.user2, post=new_post
+            ).exists()
+        )
+        Follow.objects.all().delete()
+        self.assertFalse(
+            Timeline.objects.filter(user=TestSubscribers.user2).exists()
+        )
+        Follow.objects.create(
+            user=TestSubscribers.user2,
+            author=TestSubscribers.user,
+        )
+        self.assertTrue(
+            Timeline.objects.filter(
+                user=TestSubscribers.user2, post=new_post
+            ).exists()
+        )
+
+    def test_timeline_is_trimmed_on_publish(self):
+        """Лента не растёт дальше TIMELINE_LENGTH при новых постах"""
+        Follow.objects.create(
+            user=TestSubscribers.user2,
+            author=TestSubscribers.user,
+        )
+        with mock.patch('posts.timeline.TIMELINE_LENGTH', 3):
+            posts = [
+                Post.objects.create(
+                    text=f'Запись {number}', author=TestSubscribers.user
+                )
+                for number in range(5)
+            ]
+        timeline = Timeline.objects.filter(user=TestSubscribers.user2)
+        self.assertEqual(timeline.count(), 3)
+        self.assertEqual(
+            set(timeline.values_list('post_id', flat=True)),
+            {post.pk for post in posts[-3:]},
+        )
+
+    def test_rebuild_timelines_command(self):
+        """Команда rebuild_timelines восстанавливает ленту"""
+        Follow.objects.create(
+            user=TestSubscribers.user2,
+            author=TestSubscribers.user,
+        )
+        new_post = Post.objects.create(
+            text='Тестовая запись',
+            author=TestSubscribers.user,
+        )
+        Timeline.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        response = self.follower.get('/follow/')
+        self.assertIn(new_post, response.context['page_obj'])
@@ -0,0 +1,84 @@
+"""Ветки комментариев в виде материализованного пути
+
+path комментария — путь его родителя плюс сегмент из собственного id
+фиксированной ширины. Сортировка по (post, path) выдаёт ветки ровно в том
+порядке, в каком их показывают: корни от новых к старым, под каждым
+корнем ответы от старых к новым. Поэтому и страница веток, и целое
+поддерево читаются одним диапазоном по индексу, без запроса на уровень.
+"""
+from django.db.models import CharField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad
+
+from yatube.settings import COMMENT_MAX_DEPTH, COMMENTS_PER_PAGE
+
+from .models import Comment
+from .utils.paginator import CursorPaginator
+
+SEGMENT = 10
+# Сегменты корней считаются от NEWEST вниз, чтобы новые ветки шли первыми
+NEWEST = 10 ** SEGMENT - 1
+# Следующий после цифр символ: все пути поддерева меньше path + AFTER_DIGITS
+AFTER_DIGITS = ':'
+
+
+def path_for(comment):
+    if comment.parent_id is None:
+        return f'{NEWEST - comment.pk:0{SEGMENT}d}'
+    return f'{comment.parent.path}{comment.pk:0{SEGMENT}d}'
+
+
+def subtree(path):
+    """Условия фильтра для комментария с этим путём и всех ответов на него"""
+    return {'path__gte': path, 'path__lt': path + AFTER_DIGITS}
+
+
+def place(comment):
+    """Глубина нового комментария; ответ глубже COMMENT_MAX_DEPTH
+    становится ответом на родителя, чтобы путь помещался в поле"""
+    parent = comment.parent
+    if parent is None:
+        comment.depth = 0
+        return
+    if parent.depth >= COMMENT_MAX_DEPTH:
+        comment.parent = parent = parent.parent
+    comment.depth = parent.depth + 1
+
+
+def segment(value):
+    return LPad(Cast(value, CharField()), SEGMENT, Value('0'))
+
+
+def fill_paths(model):
+    """Пути и глубины комментариев, вставленных без сигналов (bulk_create,
+    миграция): один UPDATE на корни и по два на каждый уровень. Слишком
+    глубокие ответы переносятся на уровень выше, как в place()"""
+    pending = model.objects.filter(path='')
+    pending.filter(parent__isnull=True).update(
+        path=segment(Value(NEWEST) - F('pk')), depth=0
+    )
+    parents = model.objects.filter(pk=OuterRef('parent_id'))
+    ready = pending.filter(parent__path__gt='')
+    while True:
+        ready.filter(parent__depth__gte=COMMENT_MAX_DEPTH).update(
+            parent_id=Subquery(parents.values('parent_id')[:1])
+        )
+        if not ready.update(
+            path=Concat(
+                Subquery(parents.values('path')[:1]), segment(F('pk')),
+                output_field=CharField(),
+            ),
+            depth=Subquery(parents.values('depth')[:1]) + 1,
+        ):
+            return
+
+
+def comments_page(post_id, after=None, path=None):
+    """Страница веток комментариев по курсору: сколько бы их ни было и как
+    бы глубоко они ни шли, читается COMMENTS_PER_PAGE строк одним
+    диапазоном индекса (post, path); path ограничивает одним поддеревом"""
+    comments = Comment.objects.filter(post_id=post_id)
+    if path is not None:
+        comments = comments.filter(**subtree(path))
+    return CursorPaginator(
+        comments.select_related('author'), COMMENTS_PER_PAGE, ('path',)
+    ).get_page(after=after)
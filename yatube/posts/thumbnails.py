@@ -0,0 +1,218 @@
+import logging
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore
+
+from yatube.settings import THUMBNAIL_TASK_ATTEMPTS, THUMBNAIL_TASK_RETRY
+
+from .models import Post, ThumbnailTask
+from .signals import invalidate_post_pages
+
+logger = logging.getLogger(__name__)
+
+Thumbnail = namedtuple('Thumbnail', 'width height options sizes')
+Variant = namedtuple('Variant', 'format width geometry options')
+
+# Все миниатюры, которые выводят шаблоны; sizes — ширина на странице
+THUMBNAILS = {
+    'card': Thumbnail(
+        960, 300, {'crop': 'center', 'upscale': True},
+        '(min-width: 992px) 960px, 100vw',
+    ),
+    'detail': Thumbnail(
+        960, 339, {'crop': 'center', 'upscale': True},
+        '(min-width: 768px) 75vw, 100vw',
+    ),
+}
+# Ширины вариантов для srcset
+WIDTHS = (320, 640, 960)
+# Форматы sorl -> (MIME-тип, качество), в порядке предпочтения браузером
+MODERN_FORMATS = {
+    'AVIF': ('image/avif', 60),
+    'WEBP': ('image/webp', 80),
+}
+
+
+Image.init()
+FORMATS = [
+    image_format for image_format in MODERN_FORMATS
+    if image_format in Image.SAVE
+]
+# sorl не знает расширения AVIF, а Pillow с поддержкой AVIF его пишет
+if 'AVIF' in FORMATS:
+    EXTENSIONS.setdefault('AVIF', 'avif')
+
+
+def variants(name):
+    """Все варианты миниатюры: сначала запасной в формате по умолчанию"""
+    thumbnail = THUMBNAILS[name]
+    yield Variant(
+        None, thumbnail.width,
+        f'{thumbnail.width}x{thumbnail.height}', thumbnail.options,
+    )
+    for image_format in FORMATS:
+        quality = MODERN_FORMATS[image_format][1]
+        for width in WIDTHS:
+            height = round(thumbnail.height * width / thumbnail.width)
+            yield Variant(
+                image_format, width, f'{width}x{height}',
+                dict(thumbnail.options, format=image_format, quality=quality),
+            )
+
+
+def thumbnail_file(image, variant):
+    """Файл миниатюры, который создал бы get_thumbnail, без обращения к диску
+
+    Опции дополняются так же, как в ThumbnailBackend.get_thumbnail,
+    иначе имя файла не совпадёт.
+    """
+    backend = default.backend
+    source = ImageFile(image)
+    options = dict(variant.options)
+    if settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return ImageFile(
+        backend._get_thumbnail_filename(source, variant.geometry, options),
+        default.storage,
+    )
+
+
+def attach_thumbnails(posts, name):
+    """Кладёт в посты адреса готовых вариантов миниатюры для всей пачки
+
+    post.thumbnail_url — запасная миниатюра или оригинал, пока её нет,
+    post.thumbnail_sources — пары (MIME-тип, srcset) готовых вариантов.
+    Вместо поиска в хранилище sorl на каждый вариант — один get_many
+    к кэшу и не больше одного запроса к БД за тем, чего в кэше нет.
+    """
+    name_variants = list(variants(name))
+    keys = {}
+    with_images = []
+    for post in posts:
+        post.thumbnail_url = ''
+        post.thumbnail_sources = []
+        if post.image:
+            post_keys = [
+                add_prefix(thumbnail_file(post.image, variant).key)
+                for variant in name_variants
+            ]
+            keys.update(dict.fromkeys(post_keys))
+            with_images.append((post, post_keys))
+    if not keys:
+        return posts
+    kvstore_cache = default.kvstore.cache
+    found = kvstore_cache.get_many(list(keys))
+    missing = [key for key in keys if key not in found]
+    if missing:
+        stored = dict(
+            KVStore.objects.filter(key__in=missing).values_list('key', 'value')
+        )
+        # Как и сам sorl, запоминаем в кэше и отсутствие миниатюры
+        fetched = {key: stored.get(key, EMPTY_VALUE) for key in missing}
+        kvstore_cache.set_many(fetched, settings.THUMBNAIL_CACHE_TIMEOUT)
+        found.update(fetched)
+    for post, post_keys in with_images:
+        srcsets = {}
+        for variant, key in zip(name_variants, post_keys):
+            value = found[key]
+            if value == EMPTY_VALUE:
+                continue
+            url = deserialize_image_file(value).url
+            if variant.format is None:
+                post.thumbnail_url = url
+            else:
+                srcsets.setdefault(variant.format, []).append(
+                    f'{url} {variant.width}w'
+                )
+        post.thumbnail_url = post.thumbnail_url or post.image.url
+        post.thumbnail_sources = [
+            (MODERN_FORMATS[image_format][0], ', '.join(srcset))
+            for image_format, srcset in srcsets.items()
+        ]
+    return posts
+
+
+def generate(image):
+    """Создаёт все варианты всех миниатюр, уже готовые пропускает"""
+    for name in THUMBNAILS:
+        for variant in variants(name):
+            get_thumbnail(image, variant.geometry, **variant.options)
+
+
+def enqueue_all(chunk_size=1000):
+    """Ставит в очередь все посты с картинками, например после смены
+    вариантов миниатюр или хранилища картинок"""
+    last_id = 0
+    while True:
+        ids = list(
+            Post.objects.exclude(image='').filter(pk__gt=last_id)
+            .order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return
+        ThumbnailTask.objects.bulk_create(
+            [ThumbnailTask(post_id=post_id) for post_id in ids],
+            ignore_conflicts=True,
+        )
+        last_id = ids[-1]
+
+
+def process_queue(limit=100):
+    """Разбирает до limit задач очереди, возвращает число взятых задач
+
+    Задача берётся условным UPDATE по числу попыток: если её уже забрал
+    другой воркер, обновлять будет нечего. Удаляется она только после
+    успеха, а упавшая вернётся в очередь через THUMBNAIL_TASK_RETRY секунд
+    на каждую попытку. Если картинку успели заменить, задача остаётся.
+    """
+    done = 0
+    now = timezone.now()
+    tasks = ThumbnailTask.objects.filter(
+        available__lte=now, attempts__lt=THUMBNAIL_TASK_ATTEMPTS
+    ).select_related('post')
+    for task in tasks[:limit]:
+        attempts = task.attempts + 1
+        taken = ThumbnailTask.objects.filter(
+            pk=task.pk, attempts=task.attempts
+        ).update(
+            attempts=attempts,
+            available=now + timedelta(
+                seconds=THUMBNAIL_TASK_RETRY * attempts
+            ),
+        )
+        if not taken:
+            continue
+        done += 1
+        post = task.post
+        try:
+            generate(post.image)
+        except Exception:
+            logger.exception(
+                'Миниатюры поста %s не созданы, попытка %s из %s',
+                post.pk, attempts, THUMBNAIL_TASK_ATTEMPTS,
+            )
+            continue
+        ThumbnailTask.objects.filter(
+            pk=task.pk, post__image=post.image.name
+        ).delete()
+        # Карточки и страницы были отрисованы с оригиналом картинки
+        Post.objects.filter(pk=post.pk).update(version=F('version') + 1)
+        invalidate_post_pages(Post, post, created=False)
+    return done
@@ -0,0 +1,91 @@
+from django.db import connection, transaction
+
+from yatube.settings import TIMELINE_LENGTH
+
+from .models import Follow, Post, Timeline
+
+BATCH_SIZE = 500
+
+
+def fan_out(post):
+    """Раскладывает новый пост в ленты всех подписчиков автора"""
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).order_by().values_list('user_id', flat=True))
+    for start in range(0, len(followers), BATCH_SIZE):
+        user_ids = followers[start:start + BATCH_SIZE]
+        Timeline.objects.bulk_create(
+            (
+                Timeline(user_id=user_id, post=post, pub_date=post.pub_date)
+                for user_id in user_ids
+            ),
+            ignore_conflicts=True,
+        )
+        trim_many(user_ids)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки"""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date'
+    ).values_list('id', 'pub_date')[:TIMELINE_LENGTH]
+    Timeline.objects.bulk_create(
+        (
+            Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim(user_id)
+
+
+def remove(user_id, author_id):
+    """Убирает посты автора из ленты после отписки"""
+    Timeline.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def trim(user_id):
+    """Оставляет в ленте только TIMELINE_LENGTH последних постов"""
+    entries = Timeline.objects.filter(user_id=user_id)
+    keep = entries.order_by('-pub_date', '-post_id').values('pk')
+    entries.exclude(pk__in=keep[:TIMELINE_LENGTH]).delete()
+
+
+def trim_many(user_ids):
+    """trim для пачки пользователей одним DELETE: номер строки в ленте
+    считает оконная функция"""
+    table = Timeline._meta.db_table
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE id IN ('
+            f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+            f'PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC'
+            f') AS position FROM {table} WHERE user_id IN ({placeholders})'
+            f') AS ranked WHERE position > %s)',
+            [*user_ids, TIMELINE_LENGTH],
+        )
+
+
+def rebuild(user_ids):
+    """Пересобирает ленты пользователей с нуля"""
+    for user_id in user_ids:
+        with transaction.atomic():
+            Timeline.objects.filter(user_id=user_id).delete()
+            posts = Post.objects.filter(
+                author__following__user_id=user_id
+            ).order_by('-pub_date').values_list(
+                'id', 'pub_date'
+            )[:TIMELINE_LENGTH]
+            Timeline.objects.bulk_create(
+                (
+                    Timeline(
+                        user_id=user_id, post_id=post_id, pub_date=pub_date
+                    )
+                    for post_id, pub_date in posts
+                ),
+                batch_size=BATCH_SIZE,
+            )
@@ -0,0 +1,316 @@
+import csv
+import json
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import search, threads
+from .models import Comment, Follow, Group, Post, User
+
+# Поля записей в файлах выгрузки и загрузки, по одному набору на модель;
+# image_url только для чтения людьми, загрузка берёт имя файла из image
+FIELDS = {
+    'posts': (
+        'id', 'author', 'group', 'text', 'pub_date', 'image', 'image_url'
+    ),
+    'comments': ('id', 'post', 'parent', 'author', 'text', 'pub_date'),
+    'follows': ('user', 'author', 'pub_date'),
+}
+# Что выбирать из базы для полей записи, кроме image_url
+COLUMNS = {
+    'posts': (
+        'id', 'author__username', 'group__slug', 'text', 'pub_date', 'image'
+    ),
+    'comments': (
+        'id', 'post_id', 'parent_id', 'author__username', 'text', 'pub_date'
+    ),
+    'follows': ('user__username', 'author__username', 'pub_date'),
+}
+MODELS = {'posts': Post, 'comments': Comment, 'follows': Follow}
+# Поле, по которому пользователь получает только свои записи
+OWNERS = {'posts': 'author', 'comments': 'author', 'follows': 'user'}
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def read_records(stream, data_format):
+    """Записи файла по одной, файл целиком в память не читается"""
+    if data_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def export_chunks(kind, queryset=None, chunk_size=1000, build_url=None):
+    """Записи для выгрузки пачками, таблица читается по первичному ключу
+
+    Каждая пачка — отдельный запрос с pk > последнего, без OFFSET, поэтому
+    память не растёт с размером таблицы.
+    """
+    model = MODELS[kind]
+    if queryset is None:
+        queryset = model.objects.all()
+    rows = queryset.order_by('pk').values_list('pk', *COLUMNS[kind])
+    storage = Post._meta.get_field('image').storage
+    last_id = 0
+    while True:
+        chunk = list(rows.filter(pk__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        last_id = chunk[-1][0]
+        records = []
+        for row in chunk:
+            record = dict(zip(FIELDS[kind], row[1:]))
+            record['pub_date'] = record['pub_date'].isoformat()
+            if kind == 'posts':
+                url = storage.url(record['image']) if record['image'] else ''
+                if url and build_url:
+                    url = build_url(url)
+                record['image_url'] = url
+            records.append(record)
+        yield records
+
+
+class Echo:
+    """Файл для csv.writer, который просто возвращает строку"""
+    def write(self, value):
+        return value
+
+
+def render(kind, chunks, data_format):
+    """Текст выгрузки, по одной строке-куску на пачку записей"""
+    if data_format == 'csv':
+        writer = csv.DictWriter(Echo(), FIELDS[kind])
+        yield writer.writeheader()
+        for records in chunks:
+            yield ''.join(writer.writerow(record) for record in records)
+        return
+    for records in chunks:
+        yield ''.join(
+            json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+            + '\n'
+            for record in records
+        )
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f'Неверная дата {value}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def insert(model, objects, ignore_conflicts=False):
+    """bulk_create, который пишет значения полей как есть
+
+    Вставка идёт как при loaddata, без pre_save: auto_now_add не заменяет
+    даты из файла на now(), а сама модель не меняется. Объекты с id и без
+    вставляются отдельно, как в bulk_create.
+    """
+    fields = model._meta.concrete_fields
+    groups = (
+        ([obj for obj in objects if obj.pk is not None], fields),
+        (
+            [obj for obj in objects if obj.pk is None],
+            [field for field in fields if field is not model._meta.auto_field],
+        ),
+    )
+    for group, group_fields in groups:
+        if not group:
+            continue
+        size = max(connection.ops.bulk_batch_size(group_fields, group), 1)
+        for start in range(0, len(group), size):
+            model._base_manager._insert(
+                group[start:start + size], group_fields, raw=True,
+                ignore_conflicts=ignore_conflicts,
+            )
+
+
+@contextmanager
+def deferred_indexes(model):
+    """Убирает индексы модели на время загрузки и строит их заново после
+
+    Обновлять индекс на каждую вставленную строку дольше, чем построить
+    его один раз по готовой таблице. Уникальные ограничения остаются.
+    """
+    indexes = list(model._meta.indexes)
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            editor.remove_index(model, index)
+    if model is Post:
+        search.uninstall()
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(model, index)
+        if model is Post:
+            search.install()
+
+
+class Importer:
+    """Превращает записи в объекты моделей и вставляет их пачками
+
+    Авторов и группы ищет в словарях, загруженных один раз, а посты для
+    комментариев — одним запросом на пачку.
+    """
+    def __init__(self, kind, create_users=False):
+        self.kind = kind
+        self.model = MODELS[kind]
+        self.create_users = create_users
+        self.users = dict(
+            User.objects.values_list('username', 'pk').iterator()
+        )
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.imported = 0
+        self.skipped = 0
+        self.with_images = False
+
+    def resolve_users(self, records):
+        names = {
+            record[field] for record in records
+            for field in ('user', 'author') if record.get(field)
+        }
+        missing = names - self.users.keys()
+        if missing and self.create_users:
+            User.objects.bulk_create(
+                [
+                    User(username=name, password=make_password(None))
+                    for name in missing
+                ],
+                ignore_conflicts=True,
+            )
+            self.users.update(
+                User.objects.filter(username__in=missing).values_list(
+                    'username', 'pk'
+                )
+            )
+
+    def build(self, records):
+        self.resolve_users(records)
+        if self.kind == 'comments':
+            post_ids = {record.get('post') for record in records}
+            existing = set(
+                Post.objects.filter(
+                    pk__in=post_ids - {None, ''}
+                ).values_list('pk', flat=True)
+            )
+            # Родитель должен быть из того же поста: уже в базе или
+            # раньше в этой же пачке
+            parent_ids = {record.get('parent') for record in records}
+            parents = dict(
+                Comment.objects.filter(
+                    pk__in=parent_ids - {None, ''}
+                ).values_list('pk', 'post_id')
+            )
+            parents.update(
+                (int(record['id']), int(record.get('post') or 0))
+                for record in records if record.get('id')
+            )
+        objects = []
+        for record in records:
+            author_id = self.users.get(record.get('author'))
+            if author_id is None:
+                continue
+            if self.kind != 'follows' and not record.get('text'):
+                continue
+            fields = {
+                'author_id': author_id,
+                'pub_date': parse_date(record.get('pub_date')),
+            }
+            if self.kind == 'posts':
+                slug = record.get('group')
+                if slug and slug not in self.groups:
+                    continue
+                fields.update(
+                    id=int(record.get('id') or 0) or None,
+                    group_id=self.groups.get(slug),
+                    text=record['text'],
+                    image=record.get('image') or '',
+                )
+                self.with_images = self.with_images or bool(fields['image'])
+            elif self.kind == 'comments':
+                post_id = int(record.get('post') or 0)
+                parent_id = int(record.get('parent') or 0) or None
+                if post_id not in existing or (
+                    parent_id and parents.get(parent_id) != post_id
+                ):
+                    continue
+                fields.update(
+                    id=int(record.get('id') or 0) or None,
+                    post_id=post_id,
+                    parent_id=parent_id,
+                    text=record['text'],
+                )
+            else:
+                user_id = self.users.get(record.get('user'))
+                if user_id is None or user_id == author_id:
+                    continue
+                fields['user_id'] = user_id
+            objects.append(self.model(**fields))
+        return objects
+
+    def load(self, records):
+        """Вставляет пачку в одной транзакции, возвращает число строк"""
+        objects = self.build(records)
+        try:
+            with transaction.atomic():
+                insert(
+                    self.model, objects,
+                    ignore_conflicts=self.model is Follow,
+                )
+        except IntegrityError as error:
+            raise ValueError(self.conflict(objects) or error)
+        self.imported += len(objects)
+        self.skipped += len(records) - len(objects)
+        return len(objects)
+
+    def conflict(self, objects):
+        """Описание записи пачки, id которой уже занят в базе или в самой
+        пачке"""
+        ids = [obj.pk for obj in objects if obj.pk is not None]
+        taken = set(
+            self.model.objects.filter(pk__in=ids).values_list('pk', flat=True)
+        )
+        for obj in objects:
+            if obj.pk in taken:
+                return f'запись с id {obj.pk} уже есть: {obj}'
+            if obj.pk is not None:
+                taken.add(obj.pk)
+        return None
+
+    def finish(self):
+        """Сдвигает счётчик id после вставки строк с явными id и
+        достраивает пути веток комментариев"""
+        if self.model is Comment:
+            threads.fill_paths(Comment)
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [self.model]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 urlpatterns = [
@@ -15,7 +15,30 @@ urlpatterns = [
         views.add_comment,
         name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.comments,
+        name='comments'
+    ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('export/', views.export, name='export'),
+    path('rss/', feeds.posts_rss, name='feed_rss'),
+    path('atom/', feeds.posts_atom, name='feed_atom'),
+    path('group/<slug:slug>/rss/', feeds.group_rss, name='group_feed_rss'),
+    path(
+        'group/<slug:slug>/atom/', feeds.group_atom, name='group_feed_atom'
+    ),
+    path(
+        'profile/<str:username>/rss/',
+        feeds.profile_rss,
+        name='profile_feed_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        feeds.profile_atom,
+        name='profile_feed_atom'
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
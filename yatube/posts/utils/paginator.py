@@ -1,10 +1,230 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import hashlib
+import json
 
-from yatube.settings import POSTS_PER_PAGE
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import (
+    EmptyPage, InvalidPage, Page, PageNotAnInteger, Paginator
+)
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from yatube.settings import (
+    POSTS_COUNT_CACHE_TIMEOUT, POSTS_PAGINATION, POSTS_PER_PAGE
+)
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор с закэшированным (приблизительным) числом объектов"""
+    @cached_property
+    def count(self):
+        query = str(self.object_list.query).encode()
+        key = 'paginator_count:' + hashlib.md5(query).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, POSTS_COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class CountlessPage(Page):
+    """Страница, которой не нужно общее число объектов"""
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def __repr__(self):
+        return '<Page %s>' % self.number
+
+    def has_next(self):
+        return self._has_next
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return self.paginator.per_page * (self.number - 1) + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+
+class CountlessPaginator(Paginator):
+    """Нумерованные страницы без COUNT(*), только вперёд и назад"""
+    is_countless = True
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы не является числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('На этой странице нет результатов')
+        return CountlessPage(
+            rows[:self.per_page], number, self, len(rows) > self.per_page
+        )
+
+    def get_page(self, number):
+        try:
+            return self.page(number)
+        except InvalidPage:
+            return self.page(1)
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации, номер страницы неизвестен"""
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page of %s objects>' % len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0])
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу сортировки без OFFSET и COUNT(*)
+
+    Ключ берётся из order_by() набора, по умолчанию (-pub_date, -id).
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, ordering=None):
+        super().__init__(object_list, per_page)
+        self.ordering = (
+            ordering
+            or tuple(object_list.query.order_by)
+            or ('-pub_date', '-id')
+        )
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = self.ordering[0].startswith('-')
+
+    def _field(self, name):
+        annotation = self.object_list.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return self.object_list.model._meta.get_field(name)
+
+    def encode_cursor(self, obj):
+        values = [getattr(obj, name) for name in self.fields]
+        raw = json.dumps(
+            values, default=lambda value: value.isoformat(),
+            separators=(',', ':'),
+        ).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Возвращает значения ключа или None для испорченного курсора"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw.decode())
+            if len(values) != len(self.fields):
+                return None
+            return [
+                self._field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            return None
+
+    def _keyset_filter(self, values, forward):
+        lookup = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        equal = {}
+        for name, value in zip(self.fields, values):
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def get_page(self, after=None, before=None):
+        queryset = self.object_list.order_by(*self.ordering)
+        forward = bool(after)
+        cursor = after or before
+        values = self.decode_cursor(cursor) if cursor else None
+        if values is None:
+            rows = list(queryset[:self.per_page + 1])
+            return CursorPage(
+                rows[:self.per_page], self, len(rows) > self.per_page, False
+            )
+        queryset = queryset.filter(self._keyset_filter(values, forward))
+        if forward:
+            rows = list(queryset[:self.per_page + 1])
+            return CursorPage(
+                rows[:self.per_page], self, len(rows) > self.per_page, True
+            )
+        reverse = [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+        rows = list(queryset.order_by(*reverse)[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(rows, self, True, has_previous)
+
+
+def page_window(page, on_each_side=2, on_ends=1):
+    """Номера страниц вокруг текущей, None на месте пропуска"""
+    num_pages = page.paginator.num_pages
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return list(range(1, num_pages + 1))
+    window = []
+    if page.number > on_each_side + on_ends + 1:
+        window.extend(range(1, on_ends + 1))
+        window.append(None)
+        window.extend(range(page.number - on_each_side, page.number + 1))
+    else:
+        window.extend(range(1, page.number + 1))
+    if page.number < num_pages - on_each_side - on_ends:
+        window.extend(range(page.number + 1, page.number + on_each_side + 1))
+        window.append(None)
+        window.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        window.extend(range(page.number + 1, num_pages + 1))
+    return window
+
+
+PAGINATORS = {
+    'page': Paginator,
+    'cached': CachedCountPaginator,
+    'countless': CountlessPaginator,
+}
 
 
 def paginator(queryset, request):
-    paginator = Paginator(queryset, POSTS_PER_PAGE)
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if POSTS_PAGINATION == 'cursor' or after or before:
+        paginator = CursorPaginator(queryset, POSTS_PER_PAGE)
+        return paginator.get_page(after=after, before=before)
+    paginator = PAGINATORS[POSTS_PAGINATION](queryset, POSTS_PER_PAGE)
     page_number = request.GET.get('page')
     get_obj = paginator.get_page(page_number)
     return get_obj
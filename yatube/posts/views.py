@@ -1,28 +1,51 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
+from django.db.models import F
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from core.generations import (
+    cache_page_by_generation, condition_by_generation
+)
+from core.query_budget import query_budget
+from yatube.settings import PAGE_CACHE_TIMEOUT, POSTS_PER_PAGE
+
+from . import follow_graph, threads, transfer
+from .cards import attach_cards
+from .counters import user_stats
 from .forms import PostForm, CommentForm
-from .models import Follow, Group, Post, User
-from .utils.paginator import paginator
+from .models import Comment, Follow, Group, Post, User
+from .scopes import (
+    group_scopes, index_scopes, post_page_scopes, post_scopes, profile_scopes
+)
+from .search import highlight, search_posts
+from .utils.paginator import CountlessPaginator, paginator
 
 
-@cache_page(20, key_prefix='index_page')
+@condition_by_generation(index_scopes)
+@cache_page_by_generation(PAGE_CACHE_TIMEOUT, index_scopes)
+@query_budget(5)
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.select_related('group')
+    post_list = Post.objects.select_related('author', 'group')
     page_obj = paginator(post_list, request)
+    attach_cards(page_obj, 'posts/includes/post_list.html')
     context = {
         'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
+@condition_by_generation(group_scopes)
+@cache_page_by_generation(PAGE_CACHE_TIMEOUT, group_scopes)
+@query_budget(6)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('group')
+    posts = group.posts.select_related('author', 'group')
     page_obj = paginator(posts, request)
+    attach_cards(page_obj, 'posts/includes/group_list.html')
     context = {
         'group': group,
         'page_obj': page_obj
@@ -30,44 +53,116 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@condition_by_generation(profile_scopes)
+@cache_page_by_generation(PAGE_CACHE_TIMEOUT, profile_scopes)
+# Автор 1, число постов 1, посты 1, миниатюры из KVStore 1 (если на
+# странице есть картинки), счётчики 1, сессия и пользователь 2, граф
+# подписок: после сдвига поколения 'follows' журнал 1, а если граф
+# перечитывается, ещё подписки 1
+@query_budget(9)
 def profile(request, username):
     template = 'posts/profile.html'
     author = get_object_or_404(User, username=username)
-    post_list_user = author.posts.select_related('author').filter(
-        author__username=username
-    )
-    count_post = post_list_user.count()
+    post_list_user = author.posts.select_related('author', 'group')
     page_obj = paginator(post_list_user, request)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user,
-        author=author
-    ).exists()
+    attach_cards(page_obj, 'posts/includes/profile_list.html')
+    stats = user_stats(author.id)
+    following = follows_you = False
+    if request.user.is_authenticated:
+        # Подписки в обе стороны — из графа в памяти: запросы к базе, только
+        # если его нужно догнать
+        graph = follow_graph.current()
+        following = graph.is_following(request.user.id, author.id)
+        follows_you = graph.is_following(author.id, request.user.id)
     context = {
         'page_obj': page_obj,
         'author': author,
-        'count_post': count_post,
+        'count_post': stats.posts_count,
+        'stats': stats,
         'following': following,
+        'follows_you': follows_you,
     }
     return render(request, template, context)
 
 
+# Автор поста для области кэша 1 (только при промахе), пост 1, счётчики 1,
+# комментарии 1, сессия и пользователь 2
+@condition_by_generation(post_page_scopes)
+@cache_page_by_generation(PAGE_CACHE_TIMEOUT, post_page_scopes)
+@query_budget(6)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    count_post = Post.objects.select_related('post').filter(
-        author_id=post.author.id
-    ).count()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
+    count_post = user_stats(post.author_id).posts_count
     form = CommentForm()
-    comments = post.comments.select_related('post')
+    comments_page = threads.comments_page(post.pk)
     context = {
         'post': post,
         'count_post': count_post,
         'form': form,
-        'comments': comments,
+        'comments': comments_page.object_list,
+        'comments_page': comments_page,
+    }
+    return render(request, template, context)
+
+
+@condition_by_generation(post_scopes)
+@cache_page_by_generation(PAGE_CACHE_TIMEOUT, post_scopes)
+# Путь ветки 1, страница 1, сессия и пользователь 2 — их читает шаблон
+# непустой страницы; на пустой вместо них проверка поста 1
+@query_budget(4)
+def comments(request, post_id):
+    """Следующие комментарии поста фрагментом для кнопки «Показать ещё»,
+    с ?thread=<id> — только ветка этого комментария"""
+    path = None
+    thread = request.GET.get('thread', '')
+    if thread:
+        path = get_object_or_404(
+            Comment.objects.values_list('path', flat=True),
+            pk=thread if thread.isdigit() else None, post_id=post_id,
+        )
+    comments_page = threads.comments_page(
+        post_id, request.GET.get('after'), path
+    )
+    if not comments_page.object_list:
+        get_object_or_404(Post, pk=post_id)
+    context = {
+        'post_id': post_id,
+        'thread': thread,
+        'comments': comments_page.object_list,
+        'comments_page': comments_page,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+# Сессия и пользователь 2, выдача 1: число совпадений не считается
+@query_budget(3)
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    results = search_posts(query).select_related('author', 'group')
+    # Число совпадений не считаем: для выдачи по релевантности
+    # достаточно ссылок на соседние страницы
+    page_obj = CountlessPaginator(results, POSTS_PER_PAGE).get_page(
+        request.GET.get('page')
+    )
+    for post in page_obj:
+        post.highlighted = highlight(post.search_snippet)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
     }
     return render(request, template, context)
 
 
+# Сессия и пользователь 2, форма 2 (группы, проверка группы), INSERT 1,
+# сигналы: области кэша 3 (группа, имя автора, его посты), счётчики автора
+# и группы 2, подписчики 1, лента 2 на каждые timeline.BATCH_SIZE
+# подписчиков, очередь миниатюр 1
+@query_budget(14)
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -82,6 +177,9 @@ def post_create(request):
     return redirect('posts:profile', post.author)
 
 
+# Сессия и пользователь 2, пост 1, форма 2, UPDATE 1, сигналы: области
+# кэша 2, счётчики групп при смене группы 1, очередь миниатюр 1
+@query_budget(10)
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -107,29 +205,49 @@ def post_edit(request, post_id):
     return render(request, template, context)
 
 
+# Сессия и пользователь 2, пост 1, родитель 1, INSERT 1 и путь 1,
+# счётчик комментариев 1
+@query_budget(7)
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
+    parent = None
+    parent_id = request.POST.get('parent', '')
+    if parent_id:
+        parent = get_object_or_404(
+            Comment, pk=parent_id if parent_id.isdigit() else None, post=post
+        )
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        comment.parent = parent
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(6)
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    post_list = Post.objects.all().filter(author__following__user=request.user)
+    post_list = Post.objects.filter(
+        timeline__user=request.user
+    ).select_related('author', 'group').annotate(
+        feed_date=F('timeline__pub_date'), feed_id=F('timeline__id')
+    ).order_by('-feed_date', '-feed_id')
     page_obj = paginator(post_list, request)
+    attach_cards(page_obj, 'posts/includes/post_list.html')
     context = {
         'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
+# Сессия и пользователь 2, автор 1, get_or_create 4 (SELECT, SAVEPOINT,
+# INSERT, RELEASE), сигналы: области кэша 1, счётчики 1, лента 3 (посты
+# автора, INSERT, обрезка), журнал графа 1 и раз в PRUNE_EVERY ещё 3
+@query_budget(16)
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
@@ -138,8 +256,40 @@ def profile_follow(request, username):
     return redirect('posts:profile', username=username)
 
 
+# Сессия и пользователь 2, автор 1, удаление 2 (SELECT и DELETE, чтобы
+# послать сигналы), сигналы: области кэша 1, счётчики 1, лента 1, журнал
+# графа 1 и раз в PRUNE_EVERY ещё 3
+@query_budget(12)
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
+
+
+# Сессия и пользователь 2; при отдаче ответа по запросу на пачку
+# transfer.export_chunks
+@query_budget(2, per_chunk=1)
+@login_required
+def export(request):
+    """Выгрузка своих постов, комментариев или подписок файлом"""
+    kind = request.GET.get('kind', 'posts')
+    data_format = request.GET.get('format', 'jsonl')
+    if kind not in transfer.MODELS or data_format not in transfer.FORMATS:
+        raise Http404('Нет такой выгрузки')
+    queryset = transfer.MODELS[kind].objects.filter(
+        **{transfer.OWNERS[kind]: request.user}
+    )
+    # Запросы идут уже при отдаче ответа, пачками по первичному ключу
+    chunks = transfer.export_chunks(
+        kind, queryset, build_url=request.build_absolute_uri
+    )
+    response = StreamingHttpResponse(
+        transfer.render(kind, chunks, data_format),
+        content_type=transfer.CONTENT_TYPES[data_format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{request.user.username}-{kind}.'
+        f'{data_format}"'
+    )
+    return response
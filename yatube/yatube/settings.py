@@ -1,4 +1,5 @@
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -28,6 +29,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     # 'debug_toolbar',
     'django.contrib.admin',
     'django.contrib.auth',
@@ -40,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
     # 'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -138,11 +141,73 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POSTS_PER_PAGE = 10
+FEED_ITEMS = 20
+COMMENTS_PER_PAGE = 20
+# Глубже ответы не вкладываются: путь из 10-значных сегментов в 255 символах
+COMMENT_MAX_DEPTH = 20
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Кэш в файле SQLite общий для всех процессов WSGI-сервера на машине
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
     }
 }
+# Тесты чистят кэш: рабочий файл им не отдаём
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+
+# 'page' — нумерованные страницы, 'cached' — с закэшированным числом постов,
+# 'countless' — без подсчёта постов, 'cursor' — ключевая пагинация
+POSTS_PAGINATION = 'page'
+POSTS_COUNT_CACHE_TIMEOUT = 60
+
+# Сколько последних постов хранится в ленте подписок пользователя
+TIMELINE_LENGTH = 1000
+
+# Граф подписок в памяти процесса: сколько последних событий хранит журнал
+# и после скольких изменений они вливаются в основные массивы
+FOLLOW_GRAPH_JOURNAL = 100_000
+FOLLOW_GRAPH_COMPACT = 10_000
+
+# Бюджет SQL-запросов представлений: при превышении пишем в лог или падаем.
+# Считает запросы только при QUERY_BUDGET_CHECK, в рабочем режиме выключено
+QUERY_BUDGET_CHECK = DEBUG
+QUERY_BUDGET_RAISE = False
+QUERY_BUDGET_REPEAT_THRESHOLD = 3
+
+# Сколько секунд хранится отрендеренная карточка поста
+POST_CARD_TIMEOUT = 60 * 60 * 24
+
+# Страницы лент и постов кэшируются надолго: при изменении данных
+# сигналы сдвигают поколение области кэша (core.generations)
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Загрузка картинок: файл больше UPLOAD_MAX_SIZE байт не сохраняется,
+# формат и размер в пикселях проверяются по заголовку, а оригиналы
+# больше IMAGE_MAX_DIMENSION по длинной стороне уменьшаются. JPEG уменьшается
+# ещё при декодировании, остальные форматы раскрываются в памяти целиком,
+# поэтому для них предел пикселей ниже
+FILE_UPLOAD_HANDLERS = [
+    'core.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_MAX_DECODED_PIXELS = 12_000_000
+IMAGE_MAX_DIMENSION = 2560
+
+# Очередь миниатюр: сколько раз пробовать задачу и через сколько секунд
+# повторять, с каждой попыткой пауза растёт
+THUMBNAIL_TASK_ATTEMPTS = 5
+THUMBNAIL_TASK_RETRY = 60
@@ -5,3 +5,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Граф подписок собирается при старте воркера, а не в первом запросе
+from posts import follow_graph  # noqa: E402
+
+follow_graph.warm()